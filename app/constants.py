@@ -1,3 +1,45 @@
 class Defaults:
     server_port = 6996
     adb_port = 5555
+    icon_batch_size = 32
+    icon_workers = 4
+    icon_cache_budget_mb = 64
+    icon_frame_batch_window = 0.05
+    transfer_chunk_size = 1024 * 1024
+    transfer_max_size = 512 * 1024 * 1024
+    transfer_expiry_seconds = 24 * 60 * 60
+    transfer_idle_timeout = 10 * 60
+    transfer_send_window = 4
+    transfer_send_chunk_size = 256 * 1024
+    transfer_ack_timeout = 30
+    clipboard_max_size = 16 * 1024 * 1024
+    clipboard_inline_size = 64 * 1024
+    session_queue_size = 256
+    coalesce_window = 0.05
+    io_thread_shutdown_timeout = 5
+    settings_save_delay_ms = 500
+    compression_enabled = True
+    compression_window_bits = 12
+    compression_mem_level = 5
+    compression_level = 6
+    compression_min_size = 256
+    notification_limit = 200
+    notification_eviction = "oldest"
+    history_batch_size = 100
+    history_flush_interval = 0.5
+    history_page_size = 50
+    history_max_rows = 50000
+    native_notifier_cache_size = 16
+    native_notification_rate = 1.0
+    native_notification_burst = 5
+    native_notification_summary_delay = 2.0
+    log_levels = {"app": "INFO"}
+    log_payload_limit = 512
+    log_max_bytes = 5 * 1024 * 1024
+    log_backup_count = 3
+    metrics_enabled = False
+    metrics_port = 9696
+    ping_interval = 5
+    ping_timeout = 5
+    resume_grace_period = 30
+    resume_buffer_size = 256
@@ -1,20 +1,43 @@
+import asyncio
 import json
+import logging
+import shutil
 import socket
 from pathlib import Path
-from pathlib import Path
-from PySide6.QtCore import QObject, Signal, QTimer
+from PySide6.QtCore import QObject, Signal, QTimer, QMimeData, QUrl
 from PySide6.QtGui import QGuiApplication
-import base64
 from uuid import uuid4
 from dataclasses import asdict
-from desktop_notifier import DesktopNotifier
-from desktop_notifier.common import Icon
 
 from app.model.device import Device
 from app.model.notification import Notification
+from app.model.device_state import DeviceState
 from app.constants import Defaults
+from app.core.icon_store import IconStore
+from app.core.notification_store import NotificationStore, notification_key, INSERTED, MOVED, REMOVED
+from app.core.settings_store import SettingsWriter
+from app.core.native_notifier import NativeNotifier
+from app.core.clipboard import (
+    CLIPBOARD_TRANSFER_KIND,
+    CLIPBOARD_IMAGE_KIND,
+    CLIPBOARD_IMAGE_MIME,
+    ClipboardPayload,
+    clipboard_digest,
+    clipboard_directory,
+    encode_image,
+    files_digest,
+    image_digest,
+    local_files,
+)
+from app.core.logging_setup import Payload
 from app.model.license_details import LicenseDetails
 
+logger = logging.getLogger(__name__)
+
+
+def device_key(device: Device) -> str:
+    return f"{device.name}-{device.ip_address}"
+
 
 class AppState(QObject):
     _instance = None
@@ -28,13 +51,19 @@ class AppState(QObject):
             super().__init__()
             self._initialized = True
 
-            self.device = None
-            self.notifications = []
-            self.status = None
+            self.devices = {}
+            self.active_device_key = None
             self.app_icons = {}
+            self.local_ip_address = None
             self.device_wallpapers = {}
             self.current_device_wallpaper_base64 = None
             self.should_skip_save = False
+            self._settings_writer = SettingsWriter(self.get_settings_path())
+            self.native_notifier = NativeNotifier()
+            self._save_timer = QTimer(self)
+            self._save_timer.setSingleShot(True)
+            self._save_timer.setInterval(Defaults.settings_save_delay_ms)
+            self._save_timer.timeout.connect(self._write_settings)
             self.device_name = socket.gethostname()
             self.port = Defaults.server_port
             self.adb_port = Defaults.adb_port
@@ -42,14 +71,31 @@ class AppState(QObject):
             self.adb_enabled = False
             self.is_clipboard_sync_enabled = False
             self.window_opacity = 1.0
+            self.icon_cache_budget_mb = Defaults.icon_cache_budget_mb
+            self.websocket_io_thread = False
+            self.compression_enabled = Defaults.compression_enabled
+            self.compression_window_bits = Defaults.compression_window_bits
+            self.compression_mem_level = Defaults.compression_mem_level
+            self.compression_level = Defaults.compression_level
+            self.compression_min_size = Defaults.compression_min_size
+            self.log_levels = dict(Defaults.log_levels)
+            self.notification_limit = Defaults.notification_limit
+            self.notification_eviction = Defaults.notification_eviction
+            self.notification_history_enabled = True
+            self.metrics_enabled = Defaults.metrics_enabled
+            self.metrics_port = Defaults.metrics_port
+            self.record_sessions = False
+            self.ping_interval = Defaults.ping_interval
+            self.ping_timeout = Defaults.ping_timeout
+            self.resume_grace_period = Defaults.resume_grace_period
+            self.clipboard_max_size = Defaults.clipboard_max_size
             self.is_plus = False
             self.license_details = None
             print(f"AppState initialized. is_clipboard_sync_enabled: {self.is_clipboard_sync_enabled}")
             self.load_settings()
-            self.load_cached_wallpapers()
             self.my_device = Device(
                 name=self.device_name,
-                ip_address=self.get_local_ip_address() or "N/A",
+                ip_address="N/A",
                 port=self.port,
             )
 
@@ -58,6 +104,32 @@ class AppState(QObject):
             self.websocket_status = "stopped"
             self._selected_tab = "settings"
             self.adb_connected = False
+            self._clipboard_digest = None
+            self._clipboard_generation = 0
+            self._clipboard_monitoring = False
+            self._incoming_clipboard_batch = None
+            self._incoming_clipboard_files = []
+            if self.is_clipboard_sync_enabled:
+                self.start_clipboard_monitoring()
+
+    @property
+    def active_device_state(self) -> DeviceState | None:
+        return self.devices.get(self.active_device_key)
+
+    @property
+    def device(self) -> Device | None:
+        state = self.active_device_state
+        return state.device if state else None
+
+    @property
+    def status(self):
+        state = self.active_device_state
+        return state.status if state else None
+
+    @property
+    def notifications(self) -> list:
+        state = self.active_device_state
+        return state.notifications.as_list() if state else []
 
     @property
     def selected_tab(self) -> str:
@@ -70,10 +142,6 @@ class AppState(QObject):
             self.selected_tab_changed.emit(value)
             self.license_check = True
 
-            self.clipboard_timer = QTimer(self)
-            self.clipboard_timer.timeout.connect(self.check_clipboard)
-            if self.is_clipboard_sync_enabled:
-                self.start_clipboard_monitoring()
             self.post_native_notification(
                 id="test_notification",
                 app_name="AirSync Beta",
@@ -83,13 +151,22 @@ class AppState(QObject):
             )
 
     device_changed = Signal(Device)
+    devices_changed = Signal(list)
     notifications_changed = Signal(list)
+    notification_inserted = Signal(object)
+    notification_moved = Signal(object)
+    notification_removed = Signal(object)
     status_changed = Signal()
+    battery_changed = Signal(object)
+    playback_changed = Signal(object)
+    track_changed = Signal(object)
+    volume_changed = Signal(object)
     my_device_changed = Signal(Device)
     port_changed = Signal(int)
     app_icons_changed = Signal()
     device_wallpapers_changed = Signal()
     is_clipboard_sync_enabled_changed = Signal(bool)
+    local_ip_address_changed = Signal(object)
     should_refresh_qr_changed = Signal(bool)
     websocket_status_changed = Signal(str)
     selected_tab_changed = Signal(str)
@@ -119,6 +196,26 @@ class AppState(QObject):
                     print(f"Loaded settings. is_clipboard_sync_enabled: {self.is_clipboard_sync_enabled}")
                     self.window_opacity = settings.get("window_opacity", self.window_opacity)
                     self.is_plus = settings.get("is_plus", self.is_plus)
+                    self.icon_cache_budget_mb = settings.get("icon_cache_budget_mb", self.icon_cache_budget_mb)
+                    self.websocket_io_thread = settings.get("websocket_io_thread", self.websocket_io_thread)
+                    self.compression_enabled = settings.get("compression_enabled", self.compression_enabled)
+                    self.compression_window_bits = settings.get("compression_window_bits", self.compression_window_bits)
+                    self.compression_mem_level = settings.get("compression_mem_level", self.compression_mem_level)
+                    self.compression_level = settings.get("compression_level", self.compression_level)
+                    self.compression_min_size = settings.get("compression_min_size", self.compression_min_size)
+                    self.log_levels = settings.get("log_levels", self.log_levels)
+                    self.notification_limit = settings.get("notification_limit", self.notification_limit)
+                    self.notification_eviction = settings.get("notification_eviction", self.notification_eviction)
+                    self.notification_history_enabled = settings.get(
+                        "notification_history_enabled", self.notification_history_enabled
+                    )
+                    self.metrics_enabled = settings.get("metrics_enabled", self.metrics_enabled)
+                    self.metrics_port = settings.get("metrics_port", self.metrics_port)
+                    self.record_sessions = settings.get("record_sessions", self.record_sessions)
+                    self.ping_interval = settings.get("ping_interval", self.ping_interval)
+                    self.ping_timeout = settings.get("ping_timeout", self.ping_timeout)
+                    self.resume_grace_period = settings.get("resume_grace_period", self.resume_grace_period)
+                    self.clipboard_max_size = settings.get("clipboard_max_size", self.clipboard_max_size)
                     license_details_dict = settings.get("license_details")
                     if license_details_dict:
                         self.license_details = LicenseDetails(**license_details_dict)
@@ -127,8 +224,19 @@ class AppState(QObject):
                 self.save_settings()
 
     def save_settings(self):
-        settings_path = self.get_settings_path()
-        settings = {
+        self._save_timer.start()
+
+    def flush_settings(self):
+        if self._save_timer.isActive():
+            self._save_timer.stop()
+            self._write_settings()
+        self._settings_writer.flush()
+
+    def _write_settings(self):
+        self._settings_writer.submit(json.dumps(self._settings_snapshot(), indent=4))
+
+    def _settings_snapshot(self) -> dict:
+        return {
             "device_name": self.device_name,
             "port": self.port,
             "adb_port": self.adb_port,
@@ -137,17 +245,53 @@ class AppState(QObject):
             "is_clipboard_sync_enabled": self.is_clipboard_sync_enabled,
             "window_opacity": self.window_opacity,
             "is_plus": self.is_plus,
+            "icon_cache_budget_mb": self.icon_cache_budget_mb,
+            "websocket_io_thread": self.websocket_io_thread,
+            "compression_enabled": self.compression_enabled,
+            "compression_window_bits": self.compression_window_bits,
+            "compression_mem_level": self.compression_mem_level,
+            "compression_level": self.compression_level,
+            "compression_min_size": self.compression_min_size,
+            "log_levels": self.log_levels,
+            "notification_limit": self.notification_limit,
+            "notification_eviction": self.notification_eviction,
+            "notification_history_enabled": self.notification_history_enabled,
+            "metrics_enabled": self.metrics_enabled,
+            "metrics_port": self.metrics_port,
+            "record_sessions": self.record_sessions,
+            "ping_interval": self.ping_interval,
+            "ping_timeout": self.ping_timeout,
+            "resume_grace_period": self.resume_grace_period,
+            "clipboard_max_size": self.clipboard_max_size,
             "license_details": asdict(self.license_details) if self.license_details else None,
-            "app_icons": self.app_icons,
-            "device_wallpaper": self.device_wallpapers,
         }
-        settings_path.parent.mkdir(parents=True, exist_ok=True)
-        with open(settings_path, "w") as f:
-            json.dump(settings, f, indent=4)
 
     def get_settings_path(self):
         return Path.home() / ".airsync" / "settings.json"
 
+    async def load_caches(self):
+        loop = asyncio.get_running_loop()
+        icons, wallpapers = await asyncio.gather(
+            loop.run_in_executor(None, self.scan_icon_cache),
+            loop.run_in_executor(None, self.scan_cached_wallpapers),
+        )
+        # anything a device sent while the scans ran is newer than the cache
+        self.app_icons.update({**icons, **self.app_icons})
+        self.app_icons_changed.emit()
+        self.device_wallpapers.update({**wallpapers, **self.device_wallpapers})
+        self.device_wallpapers_changed.emit()
+
+    def scan_icon_cache(self) -> dict:
+        store = IconStore()
+        store.budget_bytes = self.icon_cache_budget_mb * 1024 * 1024
+        return store.package_paths()
+
+    async def refresh_local_ip_address(self):
+        ip = await asyncio.get_running_loop().run_in_executor(None, self.get_local_ip_address)
+        self.local_ip_address = ip
+        self.my_device.ip_address = ip or "N/A"
+        self.local_ip_address_changed.emit(ip)
+
     def get_local_ip_address(self):
         try:
             s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
@@ -158,37 +302,119 @@ class AppState(QObject):
         except Exception:
             return None
 
-    def add_notification(self, notification: Notification):
-        self.notifications.insert(0, notification)
+    def set_websocket_status(self, status: str):
+        self.websocket_status = status
+        self.websocket_status_changed.emit(status)
+
+    def set_device(self, key: str, device: Device):
+        state = self.devices.get(key)
+        if state:
+            state.device = device
+        else:
+            store = NotificationStore(self.notification_limit, self.notification_eviction)
+            self.devices[key] = DeviceState(device=device, notifications=store)
+            self.devices_changed.emit(list(self.devices))
+
+        if self.active_device_key is None:
+            self.select_device(key)
+        elif key == self.active_device_key:
+            self.device_changed.emit(device)
+
+    def select_device(self, key: str | None):
+        previous_status = self.status
+        self.active_device_key = key
+        self.device_changed.emit(self.device)
+        self._emit_status_changes(previous_status, self.status)
         self.notifications_changed.emit(self.notifications)
+        self.device_wallpapers_changed.emit()
+
+    def set_status(self, key: str, status):
+        state = self.devices.get(key)
+        if not state:
+            return
+        previous_status, state.status = state.status, status
+        if key == self.active_device_key:
+            self._emit_status_changes(previous_status, status)
+
+    def _emit_status_changes(self, previous, status):
+        if previous == status:
+            return
+        battery = getattr(status, "battery", None)
+        old_music = getattr(previous, "music", None)
+        music = getattr(status, "music", None)
+        if getattr(previous, "battery", None) != battery:
+            self.battery_changed.emit(battery)
+        if getattr(old_music, "is_playing", None) != getattr(music, "is_playing", None):
+            self.playback_changed.emit(music)
+        if (getattr(old_music, "title", None), getattr(old_music, "artist", None)) != (
+            getattr(music, "title", None), getattr(music, "artist", None)
+        ):
+            self.track_changed.emit(music)
+        if (getattr(old_music, "volume", None), getattr(old_music, "is_muted", None)) != (
+            getattr(music, "volume", None), getattr(music, "is_muted", None)
+        ):
+            self.volume_changed.emit(music)
+        self.status_changed.emit()
+
+    def update_app_icons(self, icons: dict):
+        self.app_icons.update(icons)
+        self.app_icons_changed.emit()
+
+    def remove_app_icons(self, packages: list):
+        for package in packages:
+            self.app_icons.pop(package, None)
+        self.app_icons_changed.emit()
+
+    def handle_incoming_notification(self, key: str, notification: Notification):
+        self.add_notification(notification, key)
+        asyncio.ensure_future(self.post_native_notification(
+            id=notification.nid,
+            app_name=notification.app,
+            title=notification.title,
+            body=notification.body,
+            package=notification.package
+        ))
+
+    def add_notification(self, notification: Notification, key: str = None):
+        state = self.devices.get(key or self.active_device_key)
+        if not state:
+            return
+        events = state.notifications.upsert(notification)
+        if state is self.active_device_state:
+            self._emit_notification_events(events)
 
     def remove_notification(self, notif: Notification):
-        self.remove_notification_by_id(notif.nid)
+        self.remove_notification_by_id(notification_key(notif))
 
     def remove_notification_by_id(self, nid: str):
         from app.core.websocket_server import WebSocketServer
-        self.notifications = [n for n in self.notifications if n.nid != nid]
-        self.notifications_changed.emit(self.notifications)
+        state = self.active_device_state
+        event = state.notifications.remove(nid) if state else None
+        if event:
+            self._emit_notification_events([event])
         WebSocketServer().dismiss_notification(nid)
 
     def hide_notification(self, notif: Notification):
-        self.notifications = [n for n in self.notifications if n.id != notif.id]
-        self.notifications_changed.emit(self.notifications)
         self.remove_notification(notif)
 
     def clear_notifications(self):
-        if self.notifications:
-            self.notifications.clear()
-            self.notifications_changed.emit(self.notifications)
+        state = self.active_device_state
+        if state and len(state.notifications):
+            state.notifications.clear()
+            self.notifications_changed.emit([])
+
+    def _emit_notification_events(self, events):
+        signals = {
+            INSERTED: self.notification_inserted,
+            MOVED: self.notification_moved,
+            REMOVED: self.notification_removed,
+        }
+        for kind, notification in events:
+            signals[kind].emit(notification)
 
     async def post_native_notification(self, id: str, app_name: str, title: str, body: str, app_icon=None, package: str = None):
-        icon_path = None
-        if package and self.app_icons.get(package):
-            icon_path = self.app_icons[package]
-
-        app_icon_obj = Icon(path=Path(icon_path)) if icon_path else None
-        notifier = DesktopNotifier(app_name=app_name, app_icon=app_icon_obj, notification_limit=10)
-        await notifier.send(title=title, message=body)
+        icon_path = self.app_icons.get(package) if package else None
+        await self.native_notifier.post(app_name, title, body, icon_path)
 
     def sync_with_system_notifications(self):
         # TODO
@@ -199,37 +425,20 @@ class AppState(QObject):
         cache_dir.mkdir(parents=True, exist_ok=True)
         return cache_dir
 
-    def load_cached_wallpapers(self):
-        wallpaper_dir = self.wallpaper_cache_directory()
-        for file in wallpaper_dir.iterdir():
-            if file.is_file():
-                key = file.stem
-                self.device_wallpapers[key] = str(file)
-
-    def save_wallpaper_from_base64(self, base64_string: str):
-        if not self.device:
-            return
-
-        key = f"{self.device.name}-{self.device.ip_address}"
+    def scan_cached_wallpapers(self) -> dict:
         wallpaper_dir = self.wallpaper_cache_directory()
-        file_path = wallpaper_dir / f"{key}.png"
+        return {file.stem: str(file) for file in wallpaper_dir.iterdir() if file.is_file()}
 
-        try:
-            image_data = base64.b64decode(base64_string)
-            with open(file_path, "wb") as f:
-                f.write(image_data)
-            self.device_wallpapers[key] = str(file_path)
-            print(f"Wallpaper saved to: {file_path}")
-            self.device_wallpapers_changed.emit()
-        except Exception as e:
-            print(f"Error saving wallpaper: {e}")
+    def set_device_wallpaper(self, key: str, file_path: str):
+        self.device_wallpapers[key] = file_path
+        print(f"Wallpaper saved to: {file_path}")
+        self.device_wallpapers_changed.emit()
 
     @property
     def current_wallpaper_path(self) -> str | None:
         if not self.device:
             return None
-        key = f"{self.device.name}-{self.device.ip_address}"
-        return self.device_wallpapers.get(key)
+        return self.device_wallpapers.get(device_key(self.device))
 
     def set_plus_temporarily(self, value: bool):
         self.should_skip_save = True
@@ -257,38 +466,119 @@ class AppState(QObject):
         self.is_plus_changed.emit(self.is_plus)
         self.license_details_changed.emit()
 
-    def disconnect_device(self):
+    def disconnect_device(self, key: str = None):
         from app.core.websocket_server import WebSocketServer
-        WebSocketServer().send_disconnect_request()
-        self.device = None
-        self.notifications.clear()
-        self.status = None
-        self.device_changed.emit(self.device)
-        self.notifications_changed.emit(self.notifications)
-        self.status_changed.emit()
+        key = key or self.active_device_key
+        if key not in self.devices:
+            return
+        WebSocketServer().send_disconnect_request(key)
+        del self.devices[key]
+        self.devices_changed.emit(list(self.devices))
+        if key == self.active_device_key:
+            self.select_device(next(iter(self.devices), None))
 
     def start_clipboard_monitoring(self):
+        if self._clipboard_monitoring:
+            return
         print("Starting clipboard monitoring.")
-        self.last_clipboard_value = QGuiApplication.clipboard().text()
-        self.clipboard_timer.start(1000)
+        clipboard = QGuiApplication.clipboard()
+        self._clipboard_digest = clipboard_digest(clipboard.text().encode("utf-8"))
+        clipboard.dataChanged.connect(self.check_clipboard)
+        self._clipboard_monitoring = True
 
     def stop_clipboard_monitoring(self):
+        if not self._clipboard_monitoring:
+            return
         print("Stopping clipboard monitoring.")
-        self.clipboard_timer.stop()
+        QGuiApplication.clipboard().dataChanged.disconnect(self.check_clipboard)
+        self._clipboard_monitoring = False
 
     def check_clipboard(self):
-        current_clipboard = QGuiApplication.clipboard().text()
-        if current_clipboard != self.last_clipboard_value:
-            print(f"Clipboard changed: {current_clipboard}")
-            self.last_clipboard_value = current_clipboard
-            self.send_clipboard_to_android(current_clipboard)
+        clipboard = QGuiApplication.clipboard()
+        mime_data = clipboard.mimeData()
+        self._clipboard_generation += 1
+        if mime_data.hasImage():
+            asyncio.ensure_future(self._sync_clipboard_image(clipboard.image(), self._clipboard_generation))
+            return
+        paths = local_files(mime_data)
+        if paths:
+            asyncio.ensure_future(self._sync_clipboard_files(paths, self._clipboard_generation))
+            return
+
+        data = clipboard.text().encode("utf-8")
+        digest = clipboard_digest(data)
+        if not self._accept_clipboard(digest, len(data)):
+            return
+        logger.debug("Clipboard changed: %s", Payload(data))
+        self.send_clipboard_to_android([ClipboardPayload.from_bytes(CLIPBOARD_TRANSFER_KIND, data, digest)])
+
+    def _accept_clipboard(self, digest: str, size: int) -> bool:
+        if digest == self._clipboard_digest:
+            return False
+        self._clipboard_digest = digest
+        if self.clipboard_max_size and size > self.clipboard_max_size:
+            logger.warning("Not syncing clipboard of %d bytes, limit is %d", size, self.clipboard_max_size)
+            return False
+        return True
+
+    async def _sync_clipboard_image(self, image, generation):
+        loop = asyncio.get_running_loop()
+        digest = await loop.run_in_executor(None, image_digest, image)
+        if generation != self._clipboard_generation or digest == self._clipboard_digest:
+            return
+        self._clipboard_digest = digest
+        data = await loop.run_in_executor(None, encode_image, image)
+        if generation != self._clipboard_generation:
+            return
+        if self.clipboard_max_size and len(data) > self.clipboard_max_size:
+            logger.warning("Not syncing clipboard image of %d bytes, limit is %d", len(data), self.clipboard_max_size)
+            return
+        logger.debug("Clipboard image changed: %dx%d, %d bytes", image.width(), image.height(), len(data))
+        self.send_clipboard_to_android([ClipboardPayload.from_bytes(CLIPBOARD_IMAGE_KIND, data, key=CLIPBOARD_IMAGE_MIME)])
 
-    def send_clipboard_to_android(self, text: str):
+    async def _sync_clipboard_files(self, paths, generation):
+        digest = files_digest(paths)
+        if digest == self._clipboard_digest:
+            return
+        loop = asyncio.get_running_loop()
+        payloads = await loop.run_in_executor(None, ClipboardPayload.from_files, paths, self.clipboard_max_size)
+        if generation != self._clipboard_generation or not payloads:
+            return
+        # only now: a list that could not be read must not block syncing the same files later
+        self._clipboard_digest = digest
+        logger.debug("Clipboard files changed: %d files", len(payloads))
+        self.send_clipboard_to_android(payloads)
+
+    def send_clipboard_to_android(self, payloads: list):
         from app.core.websocket_server import WebSocketServer
-        message = {"type": "clipboardUpdate", "data": {"text": text}}
-        print(f"Preparing to send clipboard message: {message}")
-        WebSocketServer().send_message(json.dumps(message))
+        WebSocketServer().send_clipboard(payloads)
 
     def update_clipboard_from_android(self, text: str):
+        digest = clipboard_digest(text.encode("utf-8"))
+        if digest == self._clipboard_digest:
+            return
+        # record the hash first so the dataChanged this triggers is not sent back
+        self._clipboard_digest = digest
         QGuiApplication.clipboard().setText(text)
-        self.last_clipboard_value = text
+
+    def update_clipboard_image_from_android(self, image, digest: str):
+        if digest == self._clipboard_digest:
+            return
+        self._clipboard_digest = digest
+        QGuiApplication.clipboard().setImage(image)
+
+    def add_clipboard_file_from_android(self, batch: str, count: int, path: str):
+        if batch != self._incoming_clipboard_batch:
+            for stale in clipboard_directory().glob("*"):
+                if stale.name != batch:
+                    shutil.rmtree(stale, ignore_errors=True)
+            self._incoming_clipboard_batch = batch
+            self._incoming_clipboard_files = []
+        self._incoming_clipboard_files.append(path)
+        # a counted batch goes on the clipboard once, when its last file lands; older clients send no count
+        if count and len(self._incoming_clipboard_files) < count:
+            return
+        self._clipboard_digest = files_digest(self._incoming_clipboard_files)
+        mime_data = QMimeData()
+        mime_data.setUrls([QUrl.fromLocalFile(file) for file in self._incoming_clipboard_files])
+        QGuiApplication.clipboard().setMimeData(mime_data)
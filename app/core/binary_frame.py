@@ -0,0 +1,46 @@
+import struct
+
+# frame type, key length, payload length; followed by the UTF-8 key and the raw payload
+FRAME_HEADER = struct.Struct("!BHI")
+
+FRAME_APP_ICON = 0x01
+FRAME_WALLPAPER = 0x02
+FRAME_TRANSFER_CHUNK = 0x03
+
+FRAME_TYPES = frozenset((FRAME_APP_ICON, FRAME_WALLPAPER, FRAME_TRANSFER_CHUNK))
+
+FRAME_NAMES = {
+    FRAME_APP_ICON: "appIconFrame",
+    FRAME_WALLPAPER: "wallpaperFrame",
+    FRAME_TRANSFER_CHUNK: "transferChunkFrame",
+}
+
+
+class BinaryFrameError(ValueError):
+    pass
+
+
+def is_binary_frame(frame) -> bool:
+    return len(frame) > 0 and frame[0] in FRAME_TYPES
+
+
+def parse_frame(frame):
+    view = memoryview(frame)
+    if len(view) < FRAME_HEADER.size:
+        raise BinaryFrameError(f"frame too short: {len(view)} bytes")
+
+    frame_type, key_length, payload_length = FRAME_HEADER.unpack_from(view)
+    key_end = FRAME_HEADER.size + key_length
+    if key_end + payload_length != len(view):
+        raise BinaryFrameError(f"frame length mismatch: header says {key_end + payload_length}, got {len(view)}")
+
+    try:
+        key = str(view[FRAME_HEADER.size:key_end], "utf-8")
+    except UnicodeDecodeError as e:
+        raise BinaryFrameError(f"invalid frame key: {e}") from e
+    return frame_type, key, view[key_end:]
+
+
+def build_frame(frame_type, key, payload) -> bytes:
+    key_bytes = key.encode("utf-8")
+    return FRAME_HEADER.pack(frame_type, len(key_bytes), len(payload)) + key_bytes + bytes(payload)
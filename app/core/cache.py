@@ -0,0 +1,11 @@
+import os
+
+
+def app_cache_directory(sub_folder):
+    cache_dir = os.path.join(os.path.expanduser("~"), ".cache", "airsync-qt", sub_folder)
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+
+def app_icons_directory():
+    return app_cache_directory("AppIcons")
@@ -0,0 +1,209 @@
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import struct
+import time
+from pathlib import Path
+
+from app.constants import Defaults
+from app.core.cache import app_cache_directory
+
+logger = logging.getLogger(__name__)
+
+# Binary chunk frames carry the write offset in front of the chunk data.
+CHUNK_OFFSET = struct.Struct("!Q")
+
+_TRANSFER_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+_HASH_BLOCK_SIZE = 1024 * 1024
+
+
+class TransferError(ValueError):
+    pass
+
+
+def load_json_file(path: Path):
+    with open(path, "rb") as f:
+        return json.load(f)
+
+
+def hash_part_file(path: Path, size: int):
+    if path.stat().st_size > size:
+        path.unlink()
+        return 0, hashlib.sha256()
+    hasher = hashlib.sha256()
+    offset = 0
+    with open(path, "rb") as f:
+        while block := f.read(_HASH_BLOCK_SIZE):
+            hasher.update(block)
+            offset += len(block)
+    return offset, hasher
+
+
+class Transfer:
+    def __init__(self, owner: str, transfer_id: str, kind: str, key: str, size: int, checksum: str, path: Path):
+        self.owner = owner
+        self.id = transfer_id
+        self.kind = kind
+        self.key = key
+        self.size = size
+        self.checksum = checksum
+        self.path = path
+        self.offset = 0
+        self.hasher = hashlib.sha256()
+        self.file = None
+        self.resuming = False
+        self.last_active = time.monotonic()
+
+    def matches(self, kind: str, key: str, size: int, checksum: str) -> bool:
+        return (self.kind, self.key, self.size, self.checksum) == (kind, key, size, checksum)
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+
+class OutboundTransfer:
+    def __init__(self, transfer_id: str, size: int):
+        self.id = transfer_id
+        self.size = size
+        # bytes the receiver has written, from its transferAck replies; None until it acks the begin
+        self.acked = None
+        self.error = None
+        self._changed = asyncio.Event()
+
+    def ack(self, offset):
+        if isinstance(offset, int) and 0 <= offset <= self.size and (self.acked is None or offset >= self.acked):
+            self.acked = offset
+            self._changed.set()
+
+    def fail(self, reason):
+        self.error = reason if isinstance(reason, str) else "transfer failed"
+        self._changed.set()
+
+    async def wait_acked(self, offset: int, timeout: float) -> bool:
+        while self.error is None and (self.acked is None or self.acked < offset):
+            self._changed.clear()
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        return self.error is None
+
+
+class TransferManager:
+    def __init__(self):
+        self.directory = Path(app_cache_directory("Transfers"))
+        # keyed by (owner, id): transfer ids are only unique per device
+        self.transfers = {}
+        self.resuming = set()
+        self.cleanup_stale()
+
+    def cleanup_stale(self):
+        expiry = time.time() - Defaults.transfer_expiry_seconds
+        for file in self.directory.glob("*.part"):
+            if file.stat().st_mtime < expiry:
+                file.unlink(missing_ok=True)
+
+    def begin(self, owner, transfer_id, kind, key, size, checksum) -> Transfer:
+        if not isinstance(transfer_id, str) or not _TRANSFER_ID.match(transfer_id):
+            raise TransferError("invalid transfer id")
+        if not isinstance(kind, str) or not kind:
+            raise TransferError("missing transfer kind")
+        if not isinstance(size, int) or size < 0 or size > Defaults.transfer_max_size:
+            raise TransferError(f"invalid transfer size: {size}")
+        if not isinstance(checksum, str) or len(checksum) != 64:
+            raise TransferError("checksum must be a sha256 hex digest")
+        checksum = checksum.lower()
+        if (owner, transfer_id) in self.resuming:
+            raise TransferError("transfer is already resuming")
+
+        self.expire_idle()
+        transfer = self.transfers.get((owner, transfer_id))
+        if transfer and transfer.matches(kind, key, size, checksum):
+            transfer.last_active = time.monotonic()
+            return transfer
+        if transfer:
+            self.abort(owner, transfer_id)
+
+        # a .part file left by an earlier connection has to be hashed by resume() first
+        transfer = Transfer(owner, transfer_id, kind, key, size, checksum, self._part_path(owner, transfer_id))
+        transfer.resuming = transfer.path.exists()
+        if transfer.resuming:
+            self.resuming.add((owner, transfer_id))
+        else:
+            self.transfers[(owner, transfer_id)] = transfer
+        return transfer
+
+    async def resume(self, transfer: Transfer) -> Transfer:
+        # up to transfer_max_size of earlier data to hash, which must stay off the event loop
+        try:
+            transfer.offset, transfer.hasher = await asyncio.get_running_loop().run_in_executor(
+                None, hash_part_file, transfer.path, transfer.size
+            )
+        finally:
+            self.resuming.discard((transfer.owner, transfer.id))
+        transfer.resuming = False
+        transfer.last_active = time.monotonic()
+        self.transfers[(transfer.owner, transfer.id)] = transfer
+        logger.debug("Resuming transfer %s at offset %d", transfer.id, transfer.offset)
+        return transfer
+
+    def _part_path(self, owner, transfer_id) -> Path:
+        prefix = hashlib.sha1(str(owner).encode()).hexdigest()[:16]
+        return self.directory / f"{prefix}-{transfer_id}.part"
+
+    def write_chunk(self, owner, transfer_id, offset, data) -> int:
+        transfer = self._get(owner, transfer_id)
+        if offset != transfer.offset:
+            return transfer.offset
+        if offset + len(data) > transfer.size:
+            raise TransferError(f"chunk at {offset} overruns declared size {transfer.size}")
+
+        if transfer.file is None:
+            transfer.file = open(transfer.path, "ab")
+        transfer.file.write(data)
+        transfer.hasher.update(data)
+        transfer.offset += len(data)
+        transfer.last_active = time.monotonic()
+        return transfer.offset
+
+    def finish(self, owner, transfer_id) -> Transfer:
+        transfer = self._get(owner, transfer_id)
+        del self.transfers[(owner, transfer_id)]
+        transfer.close()
+        if transfer.offset != transfer.size:
+            transfer.path.unlink(missing_ok=True)
+            raise TransferError(f"incomplete transfer: {transfer.offset} of {transfer.size} bytes")
+        if transfer.hasher.hexdigest() != transfer.checksum:
+            transfer.path.unlink(missing_ok=True)
+            raise TransferError("checksum mismatch")
+        if not transfer.path.exists():
+            transfer.path.touch()
+        return transfer
+
+    def abort(self, owner, transfer_id):
+        transfer = self.transfers.pop((owner, transfer_id), None)
+        if transfer:
+            transfer.close()
+            transfer.path.unlink(missing_ok=True)
+
+    def suspend(self):
+        for transfer in self.transfers.values():
+            transfer.close()
+        self.expire_idle()
+
+    def expire_idle(self):
+        # a device that never comes back would otherwise keep its entries forever; the .part
+        # file stays behind so a later transferBegin can still resume from disk
+        cutoff = time.monotonic() - Defaults.transfer_idle_timeout
+        for key, transfer in list(self.transfers.items()):
+            if transfer.last_active < cutoff:
+                transfer.close()
+                del self.transfers[key]
+                logger.debug("Dropped idle transfer %s", transfer.id)
+
+    def _get(self, owner, transfer_id) -> Transfer:
+        transfer = self.transfers.get((owner, transfer_id))
+        if transfer is None:
+            raise TransferError(f"unknown transfer: {transfer_id}")
+        return transfer
@@ -0,0 +1,142 @@
+import hashlib
+import logging
+import os
+import re
+import secrets
+import struct
+from pathlib import Path
+
+from PySide6.QtCore import QBuffer, QByteArray, QIODevice
+from PySide6.QtGui import QImage
+
+logger = logging.getLogger(__name__)
+
+CLIPBOARD_TRANSFER_KIND = "clipboard"
+CLIPBOARD_IMAGE_KIND = "clipboardImage"
+CLIPBOARD_FILE_KIND = "clipboardFile"
+
+CLIPBOARD_KINDS = frozenset((CLIPBOARD_TRANSFER_KIND, CLIPBOARD_IMAGE_KIND, CLIPBOARD_FILE_KIND))
+
+CLIPBOARD_IMAGE_MIME = "image/png"
+
+# clipboardFile transfers are keyed "<batch>/<file count>/<file name>"; files sharing a batch form
+# one file list, which is complete once <file count> of them have arrived
+_BATCH_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+_HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def clipboard_directory() -> Path:
+    return Path.home() / ".airsync" / "clipboard"
+
+
+def clipboard_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def image_digest(image: QImage) -> str:
+    # hash pixels in a fixed format so the image read back from the clipboard matches the one we set
+    image = image.convertToFormat(QImage.Format_RGBA8888)
+    digest = hashlib.sha256(struct.pack("!II", image.width(), image.height()))
+    digest.update(image.constBits())
+    return digest.hexdigest()
+
+
+def files_digest(paths: list[str]) -> str:
+    return clipboard_digest("\n".join(paths).encode("utf-8"))
+
+
+def encode_image(image: QImage) -> bytes:
+    array = QByteArray()
+    buffer = QBuffer(array)
+    buffer.open(QIODevice.WriteOnly)
+    image.save(buffer, "PNG")
+    buffer.close()
+    return bytes(array.data())
+
+
+def load_image(path: Path) -> tuple[QImage, str] | None:
+    image = QImage(str(path))
+    if image.isNull():
+        return None
+    return image, image_digest(image)
+
+
+def file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(_HASH_BLOCK_SIZE):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def file_key(batch: str, count: int, name: str) -> str:
+    return f"{batch}/{count}/{name}"
+
+
+def parse_file_key(key) -> tuple[str, int, str] | None:
+    if not isinstance(key, str) or "/" not in key:
+        return None
+    batch, name = key.split("/", 1)
+    count, _, counted_name = name.partition("/")
+    if count.isdigit() and counted_name:
+        count, name = int(count), counted_name
+    else:
+        # older clients send "<batch>/<file name>" without a count
+        count = 0
+    name = Path(name).name
+    if not _BATCH_ID.match(batch) or name in ("", ".", ".."):
+        return None
+    return batch, count, name
+
+
+class ClipboardPayload:
+    def __init__(self, kind: str, size: int, digest: str, key: str = None, data: bytes = None, path: Path = None):
+        self.kind = kind
+        self.size = size
+        self.digest = digest
+        self.key = key
+        self.data = data
+        self.path = path
+
+    @classmethod
+    def from_bytes(cls, kind: str, data: bytes, digest: str = None, key: str = None):
+        return cls(kind, len(data), digest or clipboard_digest(data), key=key, data=data)
+
+    @classmethod
+    def from_files(cls, paths: list[str], max_size: int) -> list["ClipboardPayload"]:
+        files = []
+        for path in map(Path, paths):
+            try:
+                size = path.stat().st_size
+                if max_size and size > max_size:
+                    logger.warning("Not syncing %s of %d bytes, limit is %d", path.name, size, max_size)
+                    continue
+                files.append((path, size, file_digest(path)))
+            except OSError as e:
+                logger.warning("Not syncing clipboard file %s: %s", path, e)
+        batch = secrets.token_urlsafe(8)
+        return [
+            cls(CLIPBOARD_FILE_KIND, size, digest, key=file_key(batch, len(files), path.name), path=path)
+            for path, size, digest in files
+        ]
+
+    @property
+    def is_text(self) -> bool:
+        return self.kind == CLIPBOARD_TRANSFER_KIND
+
+    def text_message(self) -> dict:
+        return {"type": "clipboardUpdate", "data": {"text": self.data.decode("utf-8")}}
+
+    def read(self, offset: int, length: int) -> bytes:
+        if self.data is not None:
+            return self.data[offset:offset + length]
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            return f.read(length)
+
+
+def local_files(mime_data) -> list[str]:
+    if not mime_data.hasUrls():
+        return []
+    paths = [url.toLocalFile() for url in mime_data.urls() if url.isLocalFile()]
+    return [path for path in paths if os.path.isfile(path)]
@@ -0,0 +1,78 @@
+import time
+
+from websockets.extensions.permessage_deflate import PerMessageDeflate, ServerPerMessageDeflateFactory
+from websockets.frames import CONT, CTRL_OPCODES
+
+from app.constants import Defaults
+
+
+class SelectivePerMessageDeflate(PerMessageDeflate):
+    def __init__(self, *args, min_size=Defaults.compression_min_size, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.min_size = min_size
+        self.compress_next = True
+        self._compress_message = True
+        self.raw_bytes = 0
+        self.compressed_bytes = 0
+        self.skipped_bytes = 0
+        self.compress_seconds = 0.0
+
+    def encode(self, frame):
+        if frame.opcode in CTRL_OPCODES:
+            return frame
+        if frame.opcode is not CONT:
+            self._compress_message = self.compress_next and len(frame.data) >= self.min_size
+        if not self._compress_message:
+            self.skipped_bytes += len(frame.data)
+            return frame
+
+        start = time.perf_counter()
+        encoded = super().encode(frame)
+        self.compress_seconds += time.perf_counter() - start
+        self.raw_bytes += len(frame.data)
+        self.compressed_bytes += len(encoded.data)
+        return encoded
+
+    def stats(self) -> dict:
+        return {
+            "raw_bytes": self.raw_bytes,
+            "compressed_bytes": self.compressed_bytes,
+            "skipped_bytes": self.skipped_bytes,
+            "compress_seconds": self.compress_seconds,
+        }
+
+
+class SelectiveDeflateFactory(ServerPerMessageDeflateFactory):
+    def __init__(self, min_size=Defaults.compression_min_size, **kwargs):
+        super().__init__(**kwargs)
+        self.min_size = min_size
+
+    def process_request_params(self, params, accepted_extensions):
+        response_params, extension = super().process_request_params(params, accepted_extensions)
+        return response_params, SelectivePerMessageDeflate(
+            extension.remote_no_context_takeover,
+            extension.local_no_context_takeover,
+            extension.remote_max_window_bits,
+            extension.local_max_window_bits,
+            extension.compress_settings,
+            min_size=self.min_size,
+        )
+
+
+def deflate_extensions(enabled, window_bits, mem_level, level, min_size):
+    if not enabled:
+        return None
+    return [SelectiveDeflateFactory(
+        min_size=min_size,
+        server_max_window_bits=window_bits,
+        client_max_window_bits=window_bits,
+        compress_settings={"memLevel": mem_level, "level": level},
+    )]
+
+
+def find_deflate(websocket):
+    protocol = getattr(websocket, "protocol", None)
+    for extension in getattr(protocol, "extensions", []):
+        if isinstance(extension, SelectivePerMessageDeflate):
+            return extension
+    return None
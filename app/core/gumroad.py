@@ -1,4 +1,3 @@
-import requests
 from app.model.license_details import LicenseDetails
 
 def check_license_key_validity(key: str) -> LicenseDetails | None:
@@ -11,6 +10,8 @@ def check_license_key_validity(key: str) -> LicenseDetails | None:
             key=key
         )
 
+    import requests
+
     product_id = "smrIThhDxoQI33gQm3wwxw=="
     url = "https://api.gumroad.com/v2/licenses/verify"
     payload = {
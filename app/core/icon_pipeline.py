@@ -0,0 +1,123 @@
+import asyncio
+import base64
+import binascii
+import io
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from app.constants import Defaults
+from app.core.icon_store import IconStore
+
+logger = logging.getLogger(__name__)
+
+_INVALID_BASE64_CHARS = re.compile(r"[^A-Za-z0-9+/]")
+
+
+def clean_base64(payload: str) -> str:
+    if "base64," in payload:
+        payload = payload.split("base64,", 1)[1]
+    cleaned = _INVALID_BASE64_CHARS.sub("", payload)
+    return cleaned + "=" * (-len(cleaned) % 4)
+
+
+def decode_base64_payload(payload: str) -> bytes:
+    if "base64," in payload:
+        payload = payload.split("base64,", 1)[1]
+    try:
+        return base64.b64decode(payload, validate=True)
+    except binascii.Error:
+        logger.debug("Cleaning malformed base64 payload (len: %d)", len(payload))
+        return base64.b64decode(clean_base64(payload))
+
+
+def prepare_icons(icons: dict) -> list[tuple]:
+    prepared = []
+    for package, icon in icons.items():
+        if isinstance(icon, str):
+            try:
+                icon = decode_base64_payload(icon)
+            except (binascii.Error, ValueError) as e:
+                logger.error("Error decoding app icon for %s: %s (payload len: %d)", package, e, len(icon))
+                continue
+        elif not isinstance(icon, (bytes, memoryview)):
+            continue
+        # digest the decoded bytes so base64 and binary-frame icons share cache entries
+        prepared.append((package, IconStore.digest(icon), icon))
+    return prepared
+
+
+def decode_icon(file_path: Path, package: str, digest: str, icon_data):
+    from PIL import Image
+    try:
+        image = Image.open(io.BytesIO(icon_data))
+        image.save(file_path, "PNG")
+        return package, digest, file_path.stat().st_size
+    except Exception as e:
+        logger.error("Error decoding app icon for %s: %s (payload len: %d)", package, e, len(icon_data))
+        return package, digest, None
+
+
+def write_icon(file_path: Path, package: str, digest: str, icon_data):
+    try:
+        with open(file_path, "wb") as f:
+            f.write(icon_data)
+        return package, digest, len(icon_data)
+    except OSError as e:
+        logger.error("Error writing app icon for %s: %s", package, e)
+        return package, digest, None
+
+
+class IconPipeline:
+    def __init__(self, batch_size=Defaults.icon_batch_size, max_workers=Defaults.icon_workers):
+        self.batch_size = batch_size
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="airsync-icons")
+        self._lock = asyncio.Lock()
+
+    @property
+    def store(self) -> IconStore:
+        return IconStore()
+
+    async def ingest(self, icons: dict, on_batch, on_evict=None, writer=decode_icon):
+        loop = asyncio.get_running_loop()
+        prepared = await loop.run_in_executor(self.executor, prepare_icons, icons)
+        # another batch may evict while this one waits, so look up under the same lock as the writes
+        async with self._lock:
+            unchanged = {}
+            # digest -> (icon bytes, packages sharing it), so each distinct icon is written once
+            pending = {}
+            for package, digest, icon in prepared:
+                path = self.store.lookup(package, digest)
+                if path:
+                    unchanged[package] = path
+                elif digest in pending:
+                    pending[digest][1].append(package)
+                else:
+                    pending[digest] = (icon, [package])
+
+            logger.debug("appIcons: %d unchanged, %d to decode", len(unchanged), len(pending))
+            writes = list(pending.items())
+            if unchanged:
+                on_batch(unchanged)
+            for start in range(0, len(writes), self.batch_size):
+                batch = writes[start:start + self.batch_size]
+                results = await asyncio.gather(*[
+                    loop.run_in_executor(self.executor, writer, self.store.path_for(digest), packages[0], digest, icon)
+                    for digest, (icon, packages) in batch
+                ])
+                saved = {}
+                for (digest, (_, packages)), (_, _, size) in zip(batch, results):
+                    if size is None:
+                        continue
+                    for package in packages:
+                        self.store.record(package, digest, size)
+                        saved[package] = str(self.store.path_for(digest))
+                if saved:
+                    on_batch(saved)
+            evicted = await loop.run_in_executor(self.executor, self.store.commit)
+            if evicted and on_evict:
+                on_evict(evicted)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
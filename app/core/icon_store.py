@@ -0,0 +1,131 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+from app.constants import Defaults
+from app.core.cache import app_icons_directory
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+
+
+class IconStore:
+    _instance = None
+    # first use can come from the cache scan and an icon worker at the same time
+    _instance_lock = threading.Lock()
+
+    def __new__(cls, *args, **kwargs):
+        with cls._instance_lock:
+            if not cls._instance:
+                cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        with self._instance_lock:
+            if hasattr(self, "_initialized"):
+                return
+            self.directory = Path(app_icons_directory())
+            self.manifest_path = self.directory / "manifest.json"
+            self.budget_bytes = Defaults.icon_cache_budget_mb * 1024 * 1024
+            self.entries = {}
+            self.packages = {}
+            self._lock = threading.Lock()
+            self._dirty = False
+            self.load()
+            self._initialized = True
+
+    @staticmethod
+    def digest(payload) -> str:
+        if isinstance(payload, str):
+            payload = payload.encode("utf-8", "surrogatepass")
+        return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+    def path_for(self, digest: str) -> Path:
+        return self.directory / f"{digest}.png"
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(entry["size"] for entry in self.entries.values())
+
+    def load(self):
+        if self.manifest_path.exists():
+            try:
+                with open(self.manifest_path, "r") as f:
+                    manifest = json.load(f)
+                if manifest.get("version") == MANIFEST_VERSION:
+                    self.entries = manifest.get("entries", {})
+                    self.packages = manifest.get("packages", {})
+            except (OSError, json.JSONDecodeError) as e:
+                logger.error("Error reading icon manifest, rebuilding: %s", e)
+
+        for digest in [d for d in self.entries if not self.path_for(d).exists()]:
+            del self.entries[digest]
+        self.packages = {p: d for p, d in self.packages.items() if d in self.entries}
+        for file in self.directory.iterdir():
+            if file.is_file() and file != self.manifest_path and file.stem not in self.entries:
+                file.unlink(missing_ok=True)
+
+    def package_paths(self) -> dict:
+        with self._lock:
+            return {package: str(self.path_for(digest)) for package, digest in self.packages.items()}
+
+    def lookup(self, package: str, digest: str) -> str | None:
+        with self._lock:
+            entry = self.entries.get(digest)
+            if entry is None:
+                return None
+            entry["last_used"] = time.time()
+            self.packages[package] = digest
+            self._dirty = True
+            return str(self.path_for(digest))
+
+    def record(self, package: str, digest: str, size: int):
+        with self._lock:
+            self.entries[digest] = {"size": size, "last_used": time.time()}
+            self.packages[package] = digest
+            self._dirty = True
+
+    def commit(self) -> list[str]:
+        with self._lock:
+            evicted = self._evict()
+            if self._dirty:
+                self._save_manifest()
+                self._dirty = False
+            return evicted
+
+    def _evict(self) -> list[str]:
+        total = self.total_bytes
+        if total <= self.budget_bytes:
+            return []
+
+        evicted_digests = set()
+        for digest, entry in sorted(self.entries.items(), key=lambda item: item[1]["last_used"]):
+            if total <= self.budget_bytes:
+                break
+            self.path_for(digest).unlink(missing_ok=True)
+            total -= entry["size"]
+            evicted_digests.add(digest)
+
+        for digest in evicted_digests:
+            del self.entries[digest]
+        evicted_packages = [p for p, d in self.packages.items() if d in evicted_digests]
+        for package in evicted_packages:
+            del self.packages[package]
+        self._dirty = True
+        logger.debug("Evicted %d icons, cache now %d bytes", len(evicted_digests), total)
+        return evicted_packages
+
+    def _save_manifest(self):
+        manifest = {"version": MANIFEST_VERSION, "entries": self.entries, "packages": self.packages}
+        tmp_path = self.manifest_path.with_suffix(".tmp")
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(manifest, f, separators=(",", ":"))
+            os.replace(tmp_path, self.manifest_path)
+        except OSError as e:
+            logger.error("Error writing icon manifest: %s", e)
@@ -0,0 +1,37 @@
+import asyncio
+import threading
+
+from app.constants import Defaults
+
+
+class WebSocketIOThread(threading.Thread):
+    def __init__(self, server, port=Defaults.server_port):
+        super().__init__(name="airsync-websocket", daemon=True)
+        self.server = server
+        self.port = port
+        self.loop = asyncio.new_event_loop()
+
+    def run(self):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self.server.start(port=self.port))
+            self.loop.run_forever()
+            self.loop.run_until_complete(self.server.stop())
+        finally:
+            self.loop.close()
+
+    def submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def restart(self, port):
+        self.port = port
+        return self.submit(self._restart())
+
+    async def _restart(self):
+        await self.server.stop()
+        await self.server.start(port=self.port)
+
+    def shutdown(self, timeout=Defaults.io_thread_shutdown_timeout):
+        if self.is_alive():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.join(timeout)
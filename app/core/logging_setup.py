@@ -0,0 +1,82 @@
+import atexit
+import logging
+import logging.handlers
+import queue
+import re
+from pathlib import Path
+
+from app.constants import Defaults
+
+LOG_FORMAT = "%(asctime)s - %(threadName)s - %(name)s - %(levelname)s - %(message)s"
+
+_BASE64_BLOB = re.compile(r"[A-Za-z0-9+/]{256,}={0,2}")
+
+_listener = None
+
+
+def log_directory() -> Path:
+    log_dir = Path.home() / ".airsync" / "logs"
+    log_dir.mkdir(parents=True, exist_ok=True)
+    return log_dir
+
+
+def redact(text: str, limit=Defaults.log_payload_limit) -> str:
+    text = _BASE64_BLOB.sub(lambda match: f"<base64 {len(match.group(0))} chars>", text)
+    if len(text) > limit:
+        return f"{text[:limit]}... ({len(text)} chars)"
+    return text
+
+
+class Payload:
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __str__(self):
+        value = self.value
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return f"<binary {len(value)} bytes>"
+        if not isinstance(value, str):
+            value = repr(value)
+        return redact(value)
+
+
+def start_logging(levels: dict = None):
+    global _listener
+    if _listener is not None:
+        return
+
+    file_handler = logging.handlers.RotatingFileHandler(
+        log_directory() / "airsync.log",
+        maxBytes=Defaults.log_max_bytes,
+        backupCount=Defaults.log_backup_count,
+        encoding="utf-8",
+    )
+    file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(logging.WARNING)
+
+    _listener = logging.handlers.QueueListener(log_queue, file_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+    apply_log_levels(levels or Defaults.log_levels)
+
+
+def apply_log_levels(levels: dict):
+    for name, level in levels.items():
+        logger = logging.getLogger(None if name == "root" else name)
+        try:
+            logger.setLevel(level.upper() if isinstance(level, str) else level)
+        except (ValueError, TypeError):
+            logging.getLogger(__name__).warning("Invalid log level %r for %s", level, name)
+
+
+def stop_logging():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,51 @@
+import json
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+PROTOCOL_VERSION = 4
+RESUME_PROTOCOL_VERSION = 3
+OUTBOUND_TRANSFER_PROTOCOL_VERSION = 4
+
+
+class JsonCodec:
+    name = "json"
+    binary = False
+
+    def encode(self, message: dict) -> str:
+        return json.dumps(message)
+
+    def decode(self, frame):
+        return json.loads(frame)
+
+
+class MsgpackCodec:
+    name = "msgpack"
+    binary = True
+
+    def encode(self, message: dict) -> bytes:
+        return msgpack.packb(message, use_bin_type=True)
+
+    def decode(self, frame):
+        try:
+            return msgpack.unpackb(frame, raw=False)
+        except (ValueError, msgpack.UnpackException) as e:
+            raise ValueError(f"invalid msgpack frame: {e}") from e
+
+
+JSON_CODEC = JsonCodec()
+CODECS = {JSON_CODEC.name: JSON_CODEC}
+if msgpack:
+    CODECS[MsgpackCodec.name] = MsgpackCodec()
+
+PREFERRED_ENCODINGS = ("msgpack", "json")
+
+
+def negotiate_codec(client_encodings):
+    if isinstance(client_encodings, list):
+        for name in PREFERRED_ENCODINGS:
+            if name in client_encodings and name in CODECS:
+                return CODECS[name]
+    return JSON_CODEC
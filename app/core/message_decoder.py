@@ -0,0 +1,93 @@
+from dataclasses import fields, replace
+
+from app.model.device import Device
+from app.model.notification import Notification
+from app.model.device_status import DeviceStatus, Battery, Music
+
+
+class MessageDecodeError(ValueError):
+    pass
+
+
+class Schema:
+    def __init__(self, name, model, fields):
+        self.name = name
+        self.model = model
+        self.fields = fields
+
+    def decode(self, data):
+        if not isinstance(data, dict):
+            raise MessageDecodeError(f"{self.name} payload must be an object, got {type(data).__name__}")
+        values = []
+        for key, kind, default in self.fields:
+            value = data.get(key, default)
+            if isinstance(kind, Schema):
+                value = kind.decode(value if value is not None else {})
+            elif value is not None and not isinstance(value, kind):
+                raise MessageDecodeError(f"{self.name}.{key} has invalid type {type(value).__name__}")
+            values.append(value)
+        return self.model(*values)
+
+    def patch(self, current, data):
+        if current is None:
+            return self.decode(data)
+        if not isinstance(data, dict):
+            raise MessageDecodeError(f"{self.name} patch must be an object, got {type(data).__name__}")
+        changes = {}
+        for (key, kind, default), field in zip(self.fields, fields(self.model)):
+            if key not in data:
+                continue
+            value = data[key]
+            if isinstance(kind, Schema):
+                value = kind.patch(getattr(current, field.name), value if value is not None else {})
+            elif value is not None and not isinstance(value, kind):
+                raise MessageDecodeError(f"{self.name}.{key} has invalid type {type(value).__name__}")
+            changes[field.name] = value
+        return replace(current, **changes) if changes else current
+
+
+# Field order must match the positional order of the model dataclass.
+DEVICE_SCHEMA = Schema("device", Device, (
+    ("name", str, None),
+    ("ipAddress", str, None),
+    ("port", (int, str), None),
+))
+
+NOTIFICATION_SCHEMA = Schema("notification", Notification, (
+    ("title", str, None),
+    ("body", str, None),
+    ("app", str, None),
+    ("id", (str, int), None),
+    ("package", str, None),
+))
+
+BATTERY_SCHEMA = Schema("battery", Battery, (
+    ("level", (int, float), None),
+    ("isCharging", bool, None),
+))
+
+MUSIC_SCHEMA = Schema("music", Music, (
+    ("isPlaying", bool, None),
+    ("title", str, None),
+    ("artist", str, None),
+    ("volume", (int, float), None),
+    ("isMuted", bool, False),
+))
+
+STATUS_SCHEMA = Schema("status", DeviceStatus, (
+    ("battery", BATTERY_SCHEMA, None),
+    ("isPaired", bool, None),
+    ("music", MUSIC_SCHEMA, None),
+))
+
+
+def require_object(name, data):
+    if not isinstance(data, dict):
+        raise MessageDecodeError(f"{name} payload must be an object, got {type(data).__name__}")
+    return data
+
+
+def require_string(name, value):
+    if not isinstance(value, str) or not value:
+        raise MessageDecodeError(f"{name} must be a non-empty string")
+    return value
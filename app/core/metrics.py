@@ -0,0 +1,166 @@
+import asyncio
+import bisect
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+INBOUND = "in"
+OUTBOUND = "out"
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+DEPTH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+def frame_size(frame) -> int:
+    # text frames go over the wire as UTF-8; JSON is usually plain ASCII, which needs no encoding to count
+    if isinstance(frame, str) and not frame.isascii():
+        return len(frame.encode())
+    return len(frame)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def quantile(self, q: float):
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return self.buckets[index] if index < len(self.buckets) else float("inf")
+        return float("inf")
+
+    def render(self, name, labels):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {self.count}')
+        lines.append(f"{name}_sum{{{labels}}} {self.total}")
+        lines.append(f"{name}_count{{{labels}}} {self.count}")
+        return lines
+
+
+class MessageMetrics:
+    def __init__(self):
+        self.sizes = Histogram(SIZE_BUCKETS)
+        self.latencies = Histogram(LATENCY_BUCKETS)
+
+
+class Metrics:
+    _instance = None
+
+    def __new__(cls, *args, **kwargs):
+        if not cls._instance:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not hasattr(self, "_initialized"):
+            self._initialized = True
+            self.messages = {}
+            self.queue_depth = Histogram(DEPTH_BUCKETS)
+            self._lock = threading.Lock()
+
+    def observe(self, direction: str, message_type: str, size: int, latency: float = None):
+        with self._lock:
+            metrics = self.messages.get((direction, message_type))
+            if metrics is None:
+                metrics = self.messages[(direction, message_type)] = MessageMetrics()
+            metrics.sizes.observe(size)
+            if latency is not None:
+                metrics.latencies.observe(latency)
+
+    def observe_queue_depth(self, depth: int):
+        with self._lock:
+            self.queue_depth.observe(depth)
+
+    def reset(self):
+        with self._lock:
+            self.messages = {}
+            self.queue_depth = Histogram(DEPTH_BUCKETS)
+
+    def snapshot(self) -> list[dict]:
+        with self._lock:
+            return [
+                {
+                    "direction": direction,
+                    "type": message_type,
+                    "count": metrics.sizes.count,
+                    "bytes": metrics.sizes.total,
+                    "p50": metrics.latencies.quantile(0.5),
+                    "p99": metrics.latencies.quantile(0.99),
+                }
+                for (direction, message_type), metrics in sorted(self.messages.items())
+            ]
+
+    def render(self) -> str:
+        with self._lock:
+            messages = sorted(self.messages.items())
+            counts = ["# TYPE airsync_messages_total counter"]
+            sizes = ["# TYPE airsync_message_bytes histogram"]
+            latencies = ["# TYPE airsync_message_latency_seconds histogram"]
+            for (direction, message_type), metrics in messages:
+                labels = f'direction="{direction}",type="{message_type}"'
+                counts.append(f"airsync_messages_total{{{labels}}} {metrics.sizes.count}")
+                sizes.extend(metrics.sizes.render("airsync_message_bytes", labels))
+                if metrics.latencies.count:
+                    latencies.extend(metrics.latencies.render("airsync_message_latency_seconds", labels))
+            depth = ["# TYPE airsync_outbound_queue_depth histogram"]
+            depth.extend(self.queue_depth.render("airsync_outbound_queue_depth", 'direction="out"'))
+        return "\n".join(counts + sizes + latencies + depth) + "\n"
+
+
+class MetricsEndpoint:
+    def __init__(self, metrics: Metrics = None):
+        self.metrics = metrics or Metrics()
+        self.server = None
+
+    async def start(self, port: int):
+        try:
+            self.server = await asyncio.start_server(self._handle, "127.0.0.1", port)
+            logger.info("Metrics endpoint listening on http://127.0.0.1:%s/metrics", port)
+        except OSError as e:
+            logger.error("Failed to start metrics endpoint: %s", e)
+
+    async def stop(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+
+    async def _handle(self, reader, writer):
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+            while (await asyncio.wait_for(reader.readline(), timeout=5)) not in (b"\r\n", b"\n", b""):
+                pass
+            parts = request_line.decode("latin-1").split()
+            if len(parts) >= 2 and parts[0] == "GET" and parts[1] == "/metrics":
+                status, body = "200 OK", self.metrics.render().encode()
+            else:
+                status, body = "404 Not Found", b"not found\n"
+            writer.write(
+                f"HTTP/1.1 {status}\r\n"
+                "Content-Type: text/plain; version=0.0.4\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                "Connection: close\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
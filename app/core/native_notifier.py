@@ -0,0 +1,91 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from app.constants import Defaults
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self._updated = time.monotonic()
+
+    def take(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class NativeNotifier:
+    def __init__(self, cache_size=Defaults.native_notifier_cache_size,
+                 rate=Defaults.native_notification_rate, burst=Defaults.native_notification_burst,
+                 summary_delay=Defaults.native_notification_summary_delay):
+        self.cache_size = cache_size
+        self.summary_delay = summary_delay
+        self.bucket = TokenBucket(rate, burst)
+        self._notifiers = OrderedDict()
+        # app_name -> [count, icon_path, title, body] of notifications held back during a burst
+        self._suppressed = {}
+        self._summary_handle = None
+
+    def notifier(self, app_name: str, icon_path: str = None):
+        key = (app_name, icon_path)
+        notifier = self._notifiers.get(key)
+        if notifier is not None:
+            self._notifiers.move_to_end(key)
+            return notifier
+        # desktop_notifier pulls in the platform backend, so it is imported on the first notification
+        from desktop_notifier import DesktopNotifier
+        from desktop_notifier.common import Icon
+        app_icon = Icon(path=Path(icon_path)) if icon_path else None
+        notifier = DesktopNotifier(app_name=app_name, app_icon=app_icon, notification_limit=10)
+        self._notifiers[key] = notifier
+        while len(self._notifiers) > self.cache_size:
+            self._notifiers.popitem(last=False)
+        return notifier
+
+    async def post(self, app_name: str, title: str, body: str, icon_path: str = None):
+        if app_name not in self._suppressed and self.bucket.take():
+            await self._send(app_name, icon_path, title, body)
+            return
+        entry = self._suppressed.setdefault(app_name, [0, icon_path, title, body])
+        entry[0] += 1
+        entry[1:] = icon_path, title, body
+        if self._summary_handle is None:
+            self._summary_handle = asyncio.get_running_loop().call_later(self.summary_delay, self._post_summaries)
+
+    def clear(self):
+        if self._summary_handle:
+            self._summary_handle.cancel()
+            self._summary_handle = None
+        self._suppressed.clear()
+        self._notifiers.clear()
+
+    def _post_summaries(self):
+        self._summary_handle = None
+        for app_name in list(self._suppressed):
+            if not self.bucket.take():
+                break
+            count, icon_path, title, body = self._suppressed.pop(app_name)
+            if count > 1:
+                title, body = app_name, f"{count} new from {app_name}"
+            asyncio.ensure_future(self._send(app_name, icon_path, title, body))
+        if self._suppressed:
+            # out of tokens: the rest keep counting and go out with the next round of summaries
+            self._summary_handle = asyncio.get_running_loop().call_later(self.summary_delay, self._post_summaries)
+
+    async def _send(self, app_name, icon_path, title, body):
+        try:
+            await self.notifier(app_name, icon_path).send(title=title, message=body)
+        except Exception as e:
+            logger.warning("Failed to post native notification for %s: %s", app_name, e)
@@ -0,0 +1,209 @@
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from app.constants import Defaults
+from app.model.notification import Notification
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS notifications (
+    id INTEGER PRIMARY KEY,
+    device_key TEXT,
+    nid TEXT,
+    app TEXT,
+    package TEXT,
+    title TEXT,
+    body TEXT,
+    posted_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS notifications_device ON notifications (device_key, id);
+"""
+
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS notifications_fts USING fts5(
+    title, body, app, content='notifications', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS notifications_ai AFTER INSERT ON notifications BEGIN
+    INSERT INTO notifications_fts (rowid, title, body, app) VALUES (new.id, new.title, new.body, new.app);
+END;
+CREATE TRIGGER IF NOT EXISTS notifications_ad AFTER DELETE ON notifications BEGIN
+    INSERT INTO notifications_fts (notifications_fts, rowid, title, body, app)
+    VALUES ('delete', old.id, old.title, old.body, old.app);
+END;
+"""
+
+_COLUMNS = "n.id, n.device_key, n.nid, n.app, n.package, n.title, n.body, n.posted_at"
+
+_STOP = object()
+
+
+def history_path() -> Path:
+    return Path.home() / ".airsync" / "history.sqlite3"
+
+
+def fts_query(text: str) -> str:
+    terms = [term.replace('"', '""') for term in text.split()]
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def connect(path: Path) -> sqlite3.Connection:
+    connection = sqlite3.connect(path, timeout=5)
+    connection.row_factory = sqlite3.Row
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    return connection
+
+
+class NotificationHistory:
+    _instance = None
+
+    def __new__(cls, *args, **kwargs):
+        if not cls._instance:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self, path: Path = None):
+        if not hasattr(self, "_initialized"):
+            self._initialized = True
+            self.path = path or history_path()
+            self.fts = False
+            self.max_rows = Defaults.history_max_rows
+            self._queue = queue.SimpleQueue()
+            self._readers = threading.local()
+            self._writer = None
+            self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._writer:
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            connection = connect(self.path)
+            try:
+                self._create_schema(connection)
+            finally:
+                connection.close()
+            self._writer = threading.Thread(target=self._write_loop, name="airsync-history", daemon=True)
+            self._writer.start()
+
+    def _create_schema(self, connection):
+        with connection:
+            connection.executescript(_SCHEMA)
+            try:
+                connection.executescript(_FTS_SCHEMA)
+                self.fts = True
+            except sqlite3.OperationalError as e:
+                logger.warning("SQLite FTS5 unavailable, history search falls back to LIKE: %s", e)
+            connection.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+
+    def record(self, device_key: str, notification: Notification):
+        if self._writer:
+            self._queue.put((
+                device_key,
+                notification.nid if notification.nid is None else str(notification.nid),
+                notification.app,
+                notification.package,
+                notification.title,
+                notification.body,
+                time.time(),
+            ))
+
+    def close(self, timeout=Defaults.io_thread_shutdown_timeout):
+        with self._lock:
+            writer, self._writer = self._writer, None
+        if writer:
+            self._queue.put(_STOP)
+            writer.join(timeout)
+
+    def _write_loop(self):
+        connection = connect(self.path)
+        batch_size = Defaults.history_batch_size
+        flush_interval = Defaults.history_flush_interval
+        stopping = False
+        try:
+            while not stopping:
+                row = self._queue.get()
+                if row is _STOP:
+                    break
+                rows = [row]
+                deadline = time.monotonic() + flush_interval
+                while len(rows) < batch_size:
+                    try:
+                        row = self._queue.get(timeout=max(0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+                    if row is _STOP:
+                        stopping = True
+                        break
+                    rows.append(row)
+                self._insert(connection, rows)
+        finally:
+            connection.close()
+
+    def _insert(self, connection, rows):
+        try:
+            with connection:
+                connection.executemany(
+                    "INSERT INTO notifications (device_key, nid, app, package, title, body, posted_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                if self.max_rows:
+                    connection.execute(
+                        "DELETE FROM notifications WHERE id <= (SELECT MAX(id) FROM notifications) - ?",
+                        (self.max_rows,),
+                    )
+        except sqlite3.Error as e:
+            logger.error("Error writing %d notifications to history: %s", len(rows), e)
+
+    def _reader(self) -> sqlite3.Connection | None:
+        connection = getattr(self._readers, "connection", None)
+        if connection is None and self.path.exists():
+            connection = self._readers.connection = connect(self.path)
+        return connection
+
+    def page(self, text: str = "", device_key: str = None, before_id: int = None, limit=Defaults.history_page_size) -> list[dict]:
+        connection = self._reader()
+        if connection is None:
+            return []
+        clauses, params = [], []
+        text = text.strip()
+        if text and self.fts:
+            source = "notifications_fts JOIN notifications n ON n.id = notifications_fts.rowid"
+            clauses.append("notifications_fts MATCH ?")
+            params.append(fts_query(text))
+        else:
+            source = "notifications n"
+            if text:
+                clauses.append("(n.title LIKE ? OR n.body LIKE ? OR n.app LIKE ?)")
+                params.extend([f"%{text}%"] * 3)
+        if device_key:
+            clauses.append("n.device_key = ?")
+            params.append(device_key)
+        if before_id is not None:
+            clauses.append("n.id < ?")
+            params.append(before_id)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        try:
+            rows = connection.execute(
+                f"SELECT {_COLUMNS} FROM {source} {where} ORDER BY n.id DESC LIMIT ?",
+                (*params, limit),
+            ).fetchall()
+        except sqlite3.Error as e:
+            logger.warning("History query failed: %s", e)
+            return []
+        return [dict(row) for row in rows]
+
+    def clear(self):
+        connection = self._reader()
+        if connection is None:
+            return
+        with connection:
+            connection.execute("DELETE FROM notifications")
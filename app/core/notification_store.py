@@ -0,0 +1,92 @@
+from collections import OrderedDict
+from dataclasses import replace
+
+from app.constants import Defaults
+from app.model.notification import Notification
+
+# events carry no position: inserted and re-posted entries always go on top (the newest is
+# index 0), and views find the rest by key
+INSERTED = "inserted"
+MOVED = "moved"
+REMOVED = "removed"
+
+# oldest: evict the oldest notification overall
+# app: evict the oldest notification of the app holding the most entries
+EVICTION_POLICIES = ("oldest", "app")
+
+
+def notification_key(notification: Notification) -> str:
+    return notification.nid if notification.nid is not None else str(notification.id)
+
+
+class NotificationStore:
+    def __init__(self, limit=Defaults.notification_limit, eviction=Defaults.notification_eviction):
+        self.limit = limit
+        self.eviction = eviction if eviction in EVICTION_POLICIES else EVICTION_POLICIES[0]
+        # insertion order is oldest first, so the newest entry is always last
+        self._entries = OrderedDict()
+        self._by_package = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        return reversed(self._entries.values())
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key) -> Notification | None:
+        return self._entries.get(key)
+
+    def as_list(self) -> list[Notification]:
+        return list(self)
+
+    def upsert(self, notification: Notification) -> list[tuple]:
+        key = notification_key(notification)
+        existing = self._entries.get(key)
+        if existing is not None:
+            # a re-post is the newest notification again, for eviction as much as for display
+            notification = replace(notification, id=existing.id)
+            self._entries[key] = notification
+            self._entries.move_to_end(key)
+            self._unindex(key, existing.package)
+            self._index(key, notification.package)
+            return [(MOVED, notification)]
+
+        events = []
+        while self.limit and len(self._entries) >= self.limit:
+            events.append(self._evict())
+        self._entries[key] = notification
+        self._index(key, notification.package)
+        events.append((INSERTED, notification))
+        return events
+
+    def remove(self, key) -> tuple | None:
+        if key not in self._entries:
+            return None
+        notification = self._entries.pop(key)
+        self._unindex(key, notification.package)
+        return REMOVED, notification
+
+    def clear(self):
+        self._entries.clear()
+        self._by_package.clear()
+
+    def _evict(self) -> tuple:
+        if self.eviction == "app":
+            package = max(self._by_package, key=lambda p: len(self._by_package[p]))
+            key = next(iter(self._by_package[package]))
+        else:
+            key = next(iter(self._entries))
+        return self.remove(key)
+
+    def _index(self, key, package):
+        self._by_package.setdefault(package, OrderedDict())[key] = None
+
+    def _unindex(self, key, package):
+        keys = self._by_package.get(package)
+        if keys is not None:
+            keys.pop(key, None)
+            if not keys:
+                del self._by_package[package]
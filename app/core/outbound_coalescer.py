@@ -0,0 +1,65 @@
+import asyncio
+
+from app.constants import Defaults
+
+
+def coalesce_key(message: dict):
+    message_type = message.get("type")
+    data = message.get("data") or {}
+    if message_type == "clipboardUpdate":
+        return message_type
+    if message_type == "volumeControl" and data.get("volume") is not None:
+        return message_type, data.get("action")
+    return None
+
+
+class OutboundCoalescer:
+    def __init__(self, send, window=Defaults.coalesce_window):
+        self.send = send
+        self.window = window
+        self.pending = {}
+        self.submitted = 0
+        self.saved = 0
+        self._window_handle = None
+
+    def submit(self, message: dict, target=None):
+        self.submitted += 1
+        key = coalesce_key(message)
+        if key is None:
+            self.flush()
+            self.send(message, target)
+            return
+
+        if self._window_handle is None:
+            self.send(message, target)
+            self._open_window()
+            return
+
+        key = (target, key)
+        if key in self.pending:
+            self.saved += 1
+            del self.pending[key]
+        self.pending[key] = message
+
+    def flush(self):
+        pending, self.pending = self.pending, {}
+        for (target, _), message in pending.items():
+            self.send(message, target)
+
+    def cancel(self):
+        if self._window_handle:
+            self._window_handle.cancel()
+            self._window_handle = None
+        self.pending.clear()
+
+    def _open_window(self):
+        self._window_handle = asyncio.get_running_loop().call_later(self.window, self._close_window)
+
+    def _close_window(self):
+        self._window_handle = None
+        if self.pending:
+            self.flush()
+            self._open_window()
+
+    def stats(self) -> dict:
+        return {"submitted": self.submitted, "saved": self.saved, "pending": len(self.pending)}
@@ -0,0 +1,156 @@
+import asyncio
+import logging
+import time
+from collections import deque
+
+import websockets
+
+from app.constants import Defaults
+from app.core.message_codec import JSON_CODEC
+from app.core.compression import find_deflate
+from app.core.metrics import Metrics, OUTBOUND, frame_size
+
+logger = logging.getLogger(__name__)
+
+COALESCE = "coalesce"
+DROP = "drop"
+KEEP = "keep"
+
+# coalesce: a newer message replaces a pending one of the same type
+# drop: may be discarded first when the queue is full
+# keep: never discarded; with nothing else left to evict the queue grows past max_queue,
+#       and producers that stream, like outbound transfers, hold back with wait_writable()
+SEND_POLICIES = {
+    "clipboardUpdate": COALESCE,
+    "volumeControl": DROP,
+    "mediaControl": KEEP,
+    "dismissNotification": KEEP,
+    "disconnectRequest": KEEP,
+}
+
+# Message types whose payload is already compressed or too small to benefit.
+UNCOMPRESSED_TYPES = frozenset((
+    "transferAck",
+    "transferComplete",
+    "transferError",
+))
+
+
+class Session:
+    def __init__(self, websocket, max_queue=Defaults.session_queue_size):
+        self.websocket = websocket
+        self.max_queue = max_queue
+        self.codec = JSON_CODEC
+        self.device = None
+        self.device_key = None
+        self.protocol_version = 1
+        self.queue = deque()
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.max_depth = 0
+        self.deflate = find_deflate(websocket)
+        self.metrics = Metrics()
+        self.recorder = None
+        self.resume = None
+        self._wakeup = asyncio.Event()
+        self._writable = asyncio.Event()
+        self._writer = None
+
+    def start(self):
+        self._writer = asyncio.ensure_future(self._write_loop())
+
+    def close(self):
+        if self._writer:
+            self._writer.cancel()
+            self._writer = None
+        self.queue.clear()
+        self._writable.set()
+        if self.recorder:
+            self.recorder.close()
+            self.recorder = None
+
+    def enqueue(self, message: dict, stamp=True):
+        if stamp and self.resume:
+            message = self.resume.stamp(message)
+        message_type = message.get("type")
+        policy = SEND_POLICIES.get(message_type, KEEP)
+
+        if policy == COALESCE:
+            for index, (pending_type, _, _, enqueued_at) in enumerate(self.queue):
+                if pending_type == message_type:
+                    self.queue[index] = (message_type, self.codec.encode(message), True, enqueued_at)
+                    self.coalesced += 1
+                    return
+
+        self._append(message_type, self.codec.encode(message), message_type not in UNCOMPRESSED_TYPES)
+
+    def enqueue_frame(self, frame_type: str, frame: bytes, compress=False):
+        self._append(frame_type, frame, compress)
+
+    @property
+    def closed(self) -> bool:
+        return self._writer is None or self._writer.done()
+
+    async def wait_writable(self, depth: int) -> bool:
+        while not self.closed and len(self.queue) >= depth:
+            self._writable.clear()
+            await self._writable.wait()
+        return not self.closed
+
+    def _append(self, message_type, frame, compress):
+        if len(self.queue) >= self.max_queue and not self._make_room(message_type):
+            self.dropped += 1
+            return
+
+        self.queue.append((message_type, frame, compress, time.perf_counter()))
+        self.max_depth = max(self.max_depth, len(self.queue))
+        self.metrics.observe_queue_depth(len(self.queue))
+        self._wakeup.set()
+
+    def _make_room(self, incoming_type) -> bool:
+        for index, (pending_type, _, _, _) in enumerate(self.queue):
+            if SEND_POLICIES.get(pending_type, KEEP) != KEEP:
+                del self.queue[index]
+                self.dropped += 1
+                return True
+        # only keep messages are queued: a droppable newcomer is dropped, a keep one overflows
+        return SEND_POLICIES.get(incoming_type, KEEP) == KEEP
+
+    async def _write_loop(self):
+        while True:
+            while not self.queue:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+            message_type, frame, compress, enqueued_at = self.queue.popleft()
+            self._writable.set()
+            if self.deflate:
+                self.deflate.compress_next = compress
+            try:
+                await self.websocket.send(frame)
+                self.sent += 1
+                self.metrics.observe(OUTBOUND, message_type, frame_size(frame), time.perf_counter() - enqueued_at)
+                if self.recorder:
+                    self.recorder.record(frame, outbound=True)
+            except websockets.ConnectionClosed:
+                self.queue.clear()
+                self._writable.set()
+                return
+            except Exception:
+                logger.exception("Error sending %s, closing the session", message_type)
+                self.queue.clear()
+                self._writable.set()
+                await self.websocket.close()
+                return
+
+    def stats(self) -> dict:
+        stats = {
+            "depth": len(self.queue),
+            "max_depth": self.max_depth,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+        }
+        if self.deflate:
+            stats.update(self.deflate.stats())
+        return stats
@@ -0,0 +1,86 @@
+import logging
+import struct
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+RECORDING_MAGIC = b"AIRSYNC-REC\x01"
+RECORDING_SUFFIX = ".asrec"
+
+# seconds since the session started, flags, frame length; followed by the frame bytes
+RECORD_HEADER = struct.Struct("!dBI")
+
+FLAG_OUTBOUND = 0x01
+FLAG_BINARY = 0x02
+
+_WRITE_BUFFER_SIZE = 256 * 1024
+
+
+class RecordingError(ValueError):
+    pass
+
+
+def recordings_directory() -> Path:
+    path = Path.home() / ".airsync" / "recordings"
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+class SessionRecorder:
+    def __init__(self, path: Path):
+        self.path = path
+        self.frames = 0
+        self._started = time.monotonic()
+        self._file = open(path, "wb", buffering=_WRITE_BUFFER_SIZE)
+        self._file.write(RECORDING_MAGIC)
+
+    @classmethod
+    def for_session(cls, remote_address):
+        host, port = (remote_address or ("unknown", 0))[:2]
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{host}-{port}{RECORDING_SUFFIX}"
+        try:
+            return cls(recordings_directory() / name.replace(":", "_"))
+        except OSError as e:
+            logger.error("Cannot record session: %s", e)
+            return None
+
+    def record(self, frame, outbound=False):
+        if self._file is None:
+            return
+        flags = FLAG_OUTBOUND if outbound else 0
+        if isinstance(frame, str):
+            frame = frame.encode("utf-8")
+        else:
+            flags |= FLAG_BINARY
+        try:
+            self._file.write(RECORD_HEADER.pack(time.monotonic() - self._started, flags, len(frame)))
+            self._file.write(frame)
+            self.frames += 1
+        except OSError as e:
+            logger.error("Stopping session recording %s: %s", self.path, e)
+            self.close()
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+            logger.info("Recorded %d frames to %s", self.frames, self.path)
+
+
+def read_recording(path):
+    with open(path, "rb") as f:
+        if f.read(len(RECORDING_MAGIC)) != RECORDING_MAGIC:
+            raise RecordingError(f"{path} is not an AirSync session recording")
+        while header := f.read(RECORD_HEADER.size):
+            if len(header) < RECORD_HEADER.size:
+                logger.warning("Ignoring truncated record at the end of %s", path)
+                return
+            timestamp, flags, length = RECORD_HEADER.unpack(header)
+            frame = f.read(length)
+            if len(frame) < length:
+                logger.warning("Ignoring truncated record at the end of %s", path)
+                return
+            if not flags & FLAG_BINARY:
+                frame = frame.decode("utf-8")
+            yield timestamp, bool(flags & FLAG_OUTBOUND), frame
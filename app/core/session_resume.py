@@ -0,0 +1,105 @@
+import asyncio
+import logging
+import secrets
+from collections import deque
+
+from app.constants import Defaults
+
+logger = logging.getLogger(__name__)
+
+# Replies that only make sense on the connection that triggered them are never replayed,
+# and neither are outbound transfers, which are too large to buffer and restart on reconnect.
+UNSEQUENCED_TYPES = frozenset((
+    "helloAck",
+    "pong",
+    "transferBegin",
+    "transferChunk",
+    "transferEnd",
+    "transferAbort",
+    "transferAck",
+    "transferComplete",
+    "transferError",
+))
+
+
+class ResumeState:
+    def __init__(self, token: str, buffer_size=Defaults.resume_buffer_size):
+        self.token = token
+        self.session = None
+        self.device = None
+        self.device_key = None
+        self.next_seq = 1
+        self.last_inbound_seq = 0
+        self.buffer = deque(maxlen=buffer_size)
+        self._expiry = None
+
+    def stamp(self, message: dict) -> dict:
+        if message.get("type") in UNSEQUENCED_TYPES:
+            return message
+        message = {**message, "seq": self.next_seq}
+        self.next_seq += 1
+        self.buffer.append(message)
+        return message
+
+    def missed(self, last_seq) -> list[dict]:
+        if not isinstance(last_seq, int):
+            return list(self.buffer)
+        if self.buffer and self.buffer[0]["seq"] > last_seq + 1:
+            logger.warning("Resume of %s lost %d messages beyond the replay buffer",
+                           self.device_key, self.buffer[0]["seq"] - last_seq - 1)
+        return [message for message in self.buffer if message["seq"] > last_seq]
+
+    def accept_inbound(self, seq) -> bool:
+        if not isinstance(seq, int):
+            return True
+        if seq <= self.last_inbound_seq:
+            return False
+        self.last_inbound_seq = seq
+        return True
+
+
+class ResumeRegistry:
+    def __init__(self):
+        self.states = {}
+        self.suspended_by_device = {}
+
+    def create(self) -> ResumeState:
+        state = ResumeState(secrets.token_urlsafe(24))
+        self.states[state.token] = state
+        return state
+
+    def resume(self, token) -> ResumeState | None:
+        state = self.states.get(token) if isinstance(token, str) else None
+        if state is None:
+            return None
+        self._cancel_expiry(state)
+        if self.suspended_by_device.get(state.device_key) is state:
+            del self.suspended_by_device[state.device_key]
+        return state
+
+    def suspend(self, state: ResumeState, grace: float, on_expire):
+        self._cancel_expiry(state)
+        state.session = None
+        if state.device_key:
+            self.suspended_by_device[state.device_key] = state
+        state._expiry = asyncio.get_running_loop().call_later(grace, self._expire, state, on_expire)
+
+    def discard(self, state: ResumeState):
+        self._cancel_expiry(state)
+        self.states.pop(state.token, None)
+        if self.suspended_by_device.get(state.device_key) is state:
+            del self.suspended_by_device[state.device_key]
+
+    def clear(self):
+        for state in list(self.states.values()):
+            self.discard(state)
+
+    def _expire(self, state, on_expire):
+        state._expiry = None
+        self.discard(state)
+        on_expire(state)
+
+    def _cancel_expiry(self, state):
+        if state._expiry:
+            state._expiry.cancel()
+            state._expiry = None
@@ -0,0 +1,39 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from pathlib import Path
+
+from app.constants import Defaults
+
+logger = logging.getLogger(__name__)
+
+
+class SettingsWriter:
+    def __init__(self, path: Path):
+        self.path = path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="airsync-settings")
+        self._last_written = None
+
+    def submit(self, contents: str):
+        return self._executor.submit(self._write, contents)
+
+    def flush(self, timeout=Defaults.io_thread_shutdown_timeout):
+        try:
+            self._executor.submit(lambda: None).result(timeout)
+        except TimeoutError:
+            logger.error("Timed out waiting for settings to be written")
+
+    def _write(self, contents: str):
+        if contents == self._last_written:
+            return
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, "w") as f:
+                f.write(contents)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            self._last_written = contents
+        except OSError as e:
+            logger.error("Error writing settings: %s", e)
@@ -0,0 +1,46 @@
+import sys
+import time
+
+# Imported first by app.main, so this approximates when our own imports began.
+STARTED = time.perf_counter()
+
+# Modules that should only be imported on first use, never during startup.
+DEFERRED_MODULES = ("PIL", "qrcode", "desktop_notifier", "requests")
+
+
+class StartupProfile:
+    _instance = None
+
+    def __new__(cls, *args, **kwargs):
+        if not cls._instance:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not hasattr(self, "_initialized"):
+            self._initialized = True
+            self.phases = []
+
+    def mark(self, phase: str) -> float:
+        elapsed = time.perf_counter() - STARTED
+        self.phases.append((phase, elapsed))
+        return elapsed
+
+    def elapsed(self, phase: str) -> float | None:
+        for name, elapsed in self.phases:
+            if name == phase:
+                return elapsed
+        return None
+
+    def loaded_deferred_modules(self) -> list[str]:
+        return [name for name in DEFERRED_MODULES if name in sys.modules]
+
+    def report(self) -> str:
+        lines = ["Startup phases:"]
+        previous = 0.0
+        for phase, elapsed in self.phases:
+            lines.append(f"  {phase:<20} {(elapsed - previous) * 1000:8.1f} ms  (at {elapsed * 1000:8.1f} ms)")
+            previous = elapsed
+        loaded = self.loaded_deferred_modules()
+        lines.append(f"  deferred modules loaded: {', '.join(loaded) if loaded else 'none'}")
+        return "\n".join(lines)
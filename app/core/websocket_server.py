@@ -1,38 +1,61 @@
 import asyncio
-import json
-import websockets
-from PySide6.QtCore import QObject, Signal
-from app.core.app_state import AppState
-from app.model.device import Device
-from app.model.notification import Notification
-from app.model.device_status import DeviceStatus, Battery, Music
 import base64
+import binascii
 import os
-import io
-from PIL import Image
+import secrets
+import shutil
+import time
+import websockets
+from PySide6.QtCore import QObject, Signal
+from app.core.app_state import AppState, device_key
+from app.core.message_decoder import (
+    MessageDecodeError,
+    DEVICE_SCHEMA,
+    NOTIFICATION_SCHEMA,
+    STATUS_SCHEMA,
+    require_object,
+    require_string,
+)
+from app.core.icon_pipeline import IconPipeline, write_icon
+from app.core.binary_frame import (
+    parse_frame,
+    BinaryFrameError,
+    FRAME_APP_ICON,
+    FRAME_WALLPAPER,
+    FRAME_TRANSFER_CHUNK,
+    FRAME_NAMES,
+    build_frame,
+    is_binary_frame,
+)
+from app.core.message_codec import (
+    JSON_CODEC,
+    PROTOCOL_VERSION,
+    RESUME_PROTOCOL_VERSION,
+    OUTBOUND_TRANSFER_PROTOCOL_VERSION,
+    negotiate_codec,
+)
+from app.core.session import Session
+from app.core.compression import deflate_extensions
+from app.core.outbound_coalescer import OutboundCoalescer
+from app.core.chunked_transfer import TransferManager, TransferError, OutboundTransfer, CHUNK_OFFSET, load_json_file
+from app.core.logging_setup import Payload
+from app.core.metrics import Metrics, MetricsEndpoint, INBOUND, frame_size
+from app.core.session_recording import SessionRecorder
+from app.core.session_resume import ResumeRegistry
+from app.core.notification_history import NotificationHistory
+from app.core.clipboard import (
+    CLIPBOARD_TRANSFER_KIND,
+    CLIPBOARD_IMAGE_KIND,
+    CLIPBOARD_FILE_KIND,
+    CLIPBOARD_KINDS,
+    clipboard_directory,
+    load_image,
+    parse_file_key,
+)
 from app.constants import Defaults
 import logging
-from pathlib import Path
-log_dir = Path.home() / ".airsync" / "logs"
-log_dir.mkdir(parents=True, exist_ok=True)
-log_file = log_dir / "websocket.log"
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(log_file)
-    ]
-)
 logger = logging.getLogger(__name__)
 
-def app_cache_directory(sub_folder):
-    cache_dir = os.path.join(os.path.expanduser("~"), ".cache", "airsync-qt", sub_folder)
-    os.makedirs(cache_dir, exist_ok=True)
-    return cache_dir
-
-def app_icons_directory():
-    return app_cache_directory("AppIcons")
-
 
 class WebSocketServer(QObject):
     _instance = None
@@ -49,168 +72,726 @@ class WebSocketServer(QObject):
             self.server = None
             self.active_sessions = set()
             self.loop = None
+            self.icon_pipeline = IconPipeline()
+            self._background_tasks = set()
+            self._pending_icon_frames = {}
+            self._icon_flush_handle = None
+            self.coalescer = OutboundCoalescer(self._send_to_device)
+            self.message_handlers = {
+                "hello": self._handle_hello,
+                "ping": self._handle_ping,
+                "device": self._handle_device,
+                "notification": self._handle_notification,
+                "status": self._handle_status,
+                "statusPatch": self._handle_status_patch,
+                "appIcons": self._handle_app_icons,
+                "clipboardUpdate": self._handle_clipboard_update,
+                "wallpaperImage": self._handle_wallpaper_image,
+                "transferBegin": self._handle_transfer_begin,
+                "transferChunk": self._handle_transfer_chunk,
+                "transferEnd": self._handle_transfer_end,
+                "transferAbort": self._handle_transfer_abort,
+                "transferAck": self._handle_transfer_ack,
+                "transferComplete": self._handle_transfer_complete,
+                "transferError": self._handle_transfer_error,
+            }
+            self.frame_handlers = {
+                FRAME_APP_ICON: self._handle_app_icon_frame,
+                FRAME_WALLPAPER: self._handle_wallpaper_frame,
+                FRAME_TRANSFER_CHUNK: self._handle_transfer_chunk_frame,
+            }
+            self.transfers = TransferManager()
+            self.transfer_handlers = {
+                "wallpaper": self._on_wallpaper_transferred,
+                "appIcons": self._on_app_icons_transferred,
+                CLIPBOARD_TRANSFER_KIND: self._on_clipboard_transferred,
+                CLIPBOARD_IMAGE_KIND: self._on_clipboard_image_transferred,
+                CLIPBOARD_FILE_KIND: self._on_clipboard_file_transferred,
+            }
+            self._clipboard_streams = {}
+            self.outbound_transfers = {}
+            self.sessions_by_device = {}
+            self.resume = ResumeRegistry()
+            self.statuses = {}
+            self.history = NotificationHistory()
+            self.metrics = Metrics()
+            self.metrics_endpoint = MetricsEndpoint(self.metrics)
+            self._connect_app_state()
+
+    def _connect_app_state(self):
+        app_state = AppState()
+        self.server_status_changed.connect(app_state.set_websocket_status)
+        self.device_received.connect(app_state.set_device)
+        self.notification_received.connect(app_state.handle_incoming_notification)
+        self.status_received.connect(app_state.set_status)
+        self.app_icons_updated.connect(app_state.update_app_icons)
+        self.app_icons_evicted.connect(app_state.remove_app_icons)
+        self.wallpaper_saved.connect(app_state.set_device_wallpaper)
+        self.clipboard_received.connect(app_state.update_clipboard_from_android)
+        self.clipboard_image_received.connect(app_state.update_clipboard_image_from_android)
+        self.clipboard_file_received.connect(app_state.add_clipboard_file_from_android)
+        self.device_disconnected.connect(app_state.disconnect_device)
 
     message_received = Signal(dict)
+    server_status_changed = Signal(str)
+    device_received = Signal(str, object)
+    notification_received = Signal(str, object)
+    status_received = Signal(str, object)
+    app_icons_updated = Signal(object)
+    app_icons_evicted = Signal(object)
+    wallpaper_saved = Signal(str, str)
+    clipboard_received = Signal(str)
+    clipboard_image_received = Signal(object, str)
+    clipboard_file_received = Signal(str, int, str)
+    device_disconnected = Signal(str)
 
     async def start(self, port=Defaults.server_port):
         self.loop = asyncio.get_running_loop()
         try:
-            self.server = await websockets.serve(self.handler, "0.0.0.0", port, max_size=5 * 1024 * 1024)
-            AppState().websocket_status = "started"
-            print(f"WebSocket server started at ws://0.0.0.0:{port}")
+            app_state = AppState()
+            extensions = deflate_extensions(
+                app_state.compression_enabled,
+                app_state.compression_window_bits,
+                app_state.compression_mem_level,
+                app_state.compression_level,
+                app_state.compression_min_size,
+            )
+            self.server = await websockets.serve(
+                self.handler,
+                "0.0.0.0",
+                port,
+                max_size=5 * 1024 * 1024,
+                ping_interval=app_state.ping_interval,
+                ping_timeout=app_state.ping_timeout,
+                compression=None,
+                extensions=extensions,
+            )
+            self.server_status_changed.emit("started")
+            logger.info("WebSocket server started at ws://0.0.0.0:%s", port)
+            if app_state.metrics_enabled:
+                await self.metrics_endpoint.start(app_state.metrics_port)
         except Exception as e:
-            AppState().websocket_status = f"failed: {e}"
-            print(f"Failed to start WebSocket server: {e}")
+            self.server_status_changed.emit(f"failed: {e}")
+            logger.error("Failed to start WebSocket server: %s", e)
 
     async def stop(self):
+        await self.metrics_endpoint.stop()
         if self.server:
             self.server.close()
             await self.server.wait_closed()
             self.server = None
-            AppState().websocket_status = "stopped"
+            for state in list(self.resume.states.values()):
+                self.resume.discard(state)
+                self._on_resume_expired(state)
+            self.coalescer.cancel()
+            self.server_status_changed.emit("stopped")
 
     async def handler(self, websocket):
-        self.active_sessions.add(websocket)
+        session = Session(websocket)
+        if AppState().record_sessions:
+            session.recorder = SessionRecorder.for_session(websocket.remote_address)
+        session.start()
+        self.active_sessions.add(session)
         try:
             async for message in websocket:
-                print(f"WebSocket received: {message}")
-                try:
-                    data = json.loads(message)
-                    self.handle_message(data)
-                except json.JSONDecodeError:
-                    print(f"WebSocket JSON decode failed: {message}")
+                if session.recorder:
+                    session.recorder.record(message)
+                started = time.perf_counter()
+                message_type = self._dispatch(message, session)
+                self.metrics.observe(INBOUND, message_type, frame_size(message), time.perf_counter() - started)
+        except websockets.ConnectionClosed as e:
+            # a dropped network or a missed ping ends up here; resume handles the rest
+            logger.info("Connection to %s closed: %s", session.device_key or websocket.remote_address, e)
         finally:
-            self.active_sessions.remove(websocket)
-            if not self.active_sessions:
-                AppState().disconnect_device()
+            session.close()
+            self.active_sessions.remove(session)
+            self.transfers.suspend()
+            asyncio.get_running_loop().call_later(Defaults.transfer_idle_timeout, self.transfers.expire_idle)
+            self._release_session(session)
+
+    def _release_session(self, session):
+        state = session.resume if session.resume and session.resume.session is session else None
+        key = session.device_key
+        if not key or self.sessions_by_device.get(key) is not session:
+            if state:
+                self.resume.discard(state)
+            return
+
+        del self.sessions_by_device[key]
+        if state:
+            grace = AppState().resume_grace_period
+            self.resume.suspend(state, grace, self._on_resume_expired)
+            logger.info("Connection to %s lost, keeping its session for %ss", key, grace)
+        else:
+            self._disconnect_device(key)
+
+    def _on_resume_expired(self, state):
+        if state.device_key and state.device_key not in self.sessions_by_device:
+            self._disconnect_device(state.device_key)
+
+    def _disconnect_device(self, key):
+        self.statuses.pop(key, None)
+        self.device_disconnected.emit(key)
+
+    def _dispatch(self, message, session):
+        if isinstance(message, bytes) and (is_binary_frame(message) or not session.codec.binary):
+            self.handle_binary_frame(message, session)
+            return FRAME_NAMES.get(message[0] if message else None, "invalidFrame")
+        codec = session.codec if isinstance(message, bytes) else JSON_CODEC
+        logger.debug("WebSocket received: %s", Payload(message))
+        try:
+            data = codec.decode(message)
+        except ValueError:
+            logger.warning("WebSocket %s decode failed: %s", codec.name, Payload(message))
+            return "invalid"
+        return self.handle_message(data, session)
+
+    def handle_message(self, message, session=None):
+        if not isinstance(message, dict):
+            logger.warning("WebSocket message is not an object: %s", type(message).__name__)
+            return "invalid"
 
-    def handle_message(self, message):
         message_type = message.get("type")
-        data = message.get("data")
+        if not isinstance(message_type, str):
+            logger.warning("WebSocket message type is not a string: %s", type(message_type).__name__)
+            return "invalid"
+        handler = self.message_handlers.get(message_type)
+        if handler is None:
+            logger.warning("Unknown WebSocket message type: %s", message_type)
+            return "unknown"
 
-        if message_type == "device": 
-            device_data = {
-                "name": data.get("name"),
-                "ip_address": data.get("ipAddress"),
-                "port": data.get("port"),
-            }
-            device = Device(**device_data)
-            AppState().device = device
-            AppState().device_changed.emit(device)
-
-            wallpaper = data.get("wallpaper")
-            if wallpaper:
-                AppState().save_wallpaper_from_base64(wallpaper)
-        elif message_type == "notification":
-            notification_data = {
-                "title": data.get("title"),
-                "body": data.get("body"),
-                "app": data.get("app"),
-                "nid": data.get("id"),
-                "package": data.get("package")
-            }
-            notification = Notification(**notification_data)
-            AppState().add_notification(notification)
-            coro = AppState().post_native_notification(
-                id=notification.nid,
-                app_name=notification.app,
-                title=notification.title,
-                body=notification.body,
-                package=notification.package
-            )
-            if self.loop:
-                asyncio.run_coroutine_threadsafe(coro, self.loop)
-        elif message_type == "status":
-            battery_data = data.get("battery", {})
-            music_data = data.get("music", {})
-
-            battery = Battery(
-                level=battery_data.get("level"),
-                is_charging=battery_data.get("isCharging")
-            )
-            music = Music(
-                title=music_data.get("title"),
-                artist=music_data.get("artist"),
-                is_playing=music_data.get("isPlaying"),
-                volume=music_data.get("volume"),
-                is_muted=music_data.get("isMuted", False)
+        if session is not None and session.resume and not session.resume.accept_inbound(message.get("seq")):
+            return "duplicate"
+
+        try:
+            handler(message.get("data"), session)
+        except MessageDecodeError as e:
+            logger.warning("Malformed %s message: %s", message_type, e)
+        except Exception:
+            logger.exception("Error handling %s message", message_type)
+        return message_type
+
+    def _handle_hello(self, data, session):
+        require_object("hello", data)
+        codec = negotiate_codec(data.get("encodings"))
+        version = data.get("protocolVersion")
+        session.protocol_version = min(version, PROTOCOL_VERSION) if isinstance(version, int) else 1
+        ack = {"protocolVersion": session.protocol_version, "encoding": codec.name}
+        state = resumed = None
+        if session.protocol_version >= RESUME_PROTOCOL_VERSION:
+            state = self.resume.resume(data.get("resumeToken"))
+            resumed = state is not None
+            if not resumed:
+                state = self.resume.create()
+            ack.update(resumeToken=state.token, resumed=resumed, lastSeq=state.last_inbound_seq)
+        self._reply(session, {"type": "helloAck", "data": ack})
+        session.codec = codec
+        if session.resume and session.resume is not state:
+            # a repeated hello replaces this session's resume state; drop the old one rather than leak it
+            self._release_resume(session)
+        if state:
+            self._attach_resume(session, state, resumed, data.get("lastSeq"))
+
+    def _release_resume(self, session):
+        state, session.resume = session.resume, None
+        if state.session is session:
+            state.session = None
+            self.resume.discard(state)
+
+    def _attach_resume(self, session, state, resumed, last_seq):
+        previous, state.session, session.resume = state.session, session, state
+        if not resumed:
+            return
+        if previous is not None and previous is not session:
+            previous.resume = None
+            self._spawn(previous.websocket.close())
+        if state.device_key:
+            session.device = state.device
+            session.device_key = state.device_key
+            self.sessions_by_device[state.device_key] = session
+        missed = state.missed(last_seq)
+        for message in missed:
+            session.enqueue(message, stamp=False)
+        logger.info("Resumed session for %s, replaying %d messages", state.device_key, len(missed))
+
+    def _handle_ping(self, data, session):
+        self._reply(session, {"type": "pong", "data": data})
+
+    def _handle_device(self, data, session):
+        device = DEVICE_SCHEMA.decode(data)
+        key = device_key(device)
+        if session.device_key and session.device_key != key:
+            self.sessions_by_device.pop(session.device_key, None)
+        session.device = device
+        session.device_key = key
+        self.sessions_by_device[key] = session
+        stale = self.resume.suspended_by_device.get(key)
+        if stale and stale is not session.resume:
+            self.resume.discard(stale)
+        if session.resume:
+            session.resume.device = device
+            session.resume.device_key = key
+        self.device_received.emit(key, device)
+
+        wallpaper = data.get("wallpaper")
+        if wallpaper:
+            self._save_wallpaper_from_base64(session, wallpaper)
+
+    def _handle_notification(self, data, session):
+        notification = NOTIFICATION_SCHEMA.decode(data)
+        if self._require_device(session, "notification"):
+            self.history.record(session.device_key, notification)
+            self.notification_received.emit(session.device_key, notification)
+
+    def _handle_status(self, data, session):
+        status = STATUS_SCHEMA.decode(data)
+        if self._require_device(session, "status"):
+            self._update_status(session.device_key, status)
+
+    def _handle_status_patch(self, data, session):
+        if self._require_device(session, "statusPatch"):
+            status = STATUS_SCHEMA.patch(self.statuses.get(session.device_key), data)
+            self._update_status(session.device_key, status)
+
+    def _update_status(self, key, status):
+        if self.statuses.get(key) != status:
+            self.statuses[key] = status
+            self.status_received.emit(key, status)
+
+    def _handle_app_icons(self, data, session):
+        require_object("appIcons", data)
+        logger.debug("Received appIcons message with %d icons", len(data))
+        self._spawn(self.icon_pipeline.ingest(data, self.app_icons_updated.emit, self.app_icons_evicted.emit))
+
+    def _handle_clipboard_update(self, data, session):
+        text = require_object("clipboardUpdate", data).get("text")
+        if isinstance(text, str):
+            self._receive_clipboard(text)
+
+    def _receive_clipboard(self, text):
+        max_size = AppState().clipboard_max_size
+        if max_size and len(text.encode("utf-8")) > max_size:
+            logger.warning("Ignoring clipboard of %d characters from device, limit is %d bytes", len(text), max_size)
+            return
+        self.clipboard_received.emit(text)
+
+    def _handle_wallpaper_image(self, data, session):
+        base64_string = require_object("wallpaperImage", data).get("wallpaper")
+        if base64_string:
+            logger.debug("Received wallpaper image data (%d chars)", len(base64_string))
+            self._save_wallpaper_from_base64(session, base64_string)
+
+    def _require_device(self, session, message_type):
+        if session is None or session.device_key is None:
+            logger.warning("Ignoring %s message from a session that has not identified its device", message_type)
+            return False
+        return True
+
+    def _wallpaper_target(self, session):
+        if session is None or not session.device_key:
+            return None, None
+        key = session.device_key
+        return key, AppState().wallpaper_cache_directory() / f"{key}.png"
+
+    def _save_wallpaper_from_base64(self, session, base64_string):
+        try:
+            image_data = base64.b64decode(base64_string)
+        except binascii.Error as e:
+            logger.error("Error decoding wallpaper: %s", e)
+            return
+        self._save_wallpaper_bytes(session, image_data)
+
+    def _save_wallpaper_bytes(self, session, image_data):
+        key, file_path = self._wallpaper_target(session)
+        if not key:
+            return
+        try:
+            with open(file_path, "wb") as f:
+                f.write(image_data)
+            self.wallpaper_saved.emit(key, str(file_path))
+        except OSError as e:
+            logger.error("Error saving wallpaper: %s", e)
+
+    def _save_wallpaper_file(self, session, source_path):
+        key, file_path = self._wallpaper_target(session)
+        if not key:
+            source_path.unlink(missing_ok=True)
+            return
+        try:
+            os.replace(source_path, file_path)
+            self.wallpaper_saved.emit(key, str(file_path))
+        except OSError as e:
+            logger.error("Error saving wallpaper: %s", e)
+
+    def handle_binary_frame(self, frame, session=None):
+        try:
+            frame_type, key, payload = parse_frame(frame)
+        except BinaryFrameError as e:
+            logger.warning("Malformed binary frame: %s", e)
+            return
+
+        handler = self.frame_handlers.get(frame_type)
+        if handler is None:
+            logger.warning("Unknown binary frame type: %s", frame_type)
+            return
+        try:
+            handler(key, payload, session)
+        except Exception:
+            logger.exception("Error handling %s", FRAME_NAMES[frame_type])
+
+    def _handle_app_icon_frame(self, package, payload, session):
+        if not package:
+            logger.warning("Binary app icon frame without a package name")
+            return
+        self._pending_icon_frames[package] = payload
+        if self._icon_flush_handle is None:
+            self._icon_flush_handle = asyncio.get_running_loop().call_later(
+                Defaults.icon_frame_batch_window, self._flush_icon_frames
             )
-            status = DeviceStatus(
-                battery=battery,
-                is_paired=data.get("isPaired"),
-                music=music
+
+    def _flush_icon_frames(self):
+        icons, self._pending_icon_frames = self._pending_icon_frames, {}
+        self._icon_flush_handle = None
+        self._spawn(self.icon_pipeline.ingest(icons, self.app_icons_updated.emit, self.app_icons_evicted.emit, writer=write_icon))
+
+    def _handle_wallpaper_frame(self, key, payload, session):
+        self._save_wallpaper_bytes(session, payload)
+
+    @staticmethod
+    def _transfer_owner(session):
+        # ids are only unique per device; an unidentified connection owns only its own transfers
+        if session is None:
+            return None
+        return session.device_key or f"session-{id(session)}"
+
+    def _handle_transfer_begin(self, data, session):
+        require_object("transferBegin", data)
+        max_size = AppState().clipboard_max_size
+        if data.get("kind") in CLIPBOARD_KINDS and max_size and isinstance(data.get("size"), int) \
+                and data["size"] > max_size:
+            self._reply(session, {"type": "transferError", "data": {"id": data.get("id"), "reason": "clipboard too large"}})
+            return
+        try:
+            transfer = self.transfers.begin(
+                self._transfer_owner(session), data.get("id"), data.get("kind"), data.get("key"), data.get("size"),
+                data.get("checksum"),
             )
-            AppState().status = status
-            AppState().status_changed.emit()
-        elif message_type == "appIcons":
-            logger.debug(f"Received appIcons message: {data}")
-            for package, base64_icon in data.items():
-                cleaned_base64 = base64_icon
-                if "base64," in cleaned_base64:
-                    cleaned_base64 = cleaned_base64.split("base64,", 1)[1]
-                valid_chars = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/="
-                original_cleaned_base64 = cleaned_base64
-                cleaned_base64 = "".join(c for c in cleaned_base64 if c in valid_chars)
-                if original_cleaned_base64 != cleaned_base64:
-                    logger.debug(f"Removed invalid characters from base64 string. Original length: {len(original_cleaned_base64)}, New length: {len(cleaned_base64)}")
-                    missing_padding = len(cleaned_base64) % 4
-                    if missing_padding != 0:
-                        cleaned_base64 += '=' * (4 - missing_padding)
-
-                logger.debug(f"Cleaned base64 (after stripping and validation): {cleaned_base64[:50]}... (len: {len(cleaned_base64)})")
-                logger.debug(f"Attempting to decode base64 string (first 100 chars): {cleaned_base64[:100]}... (len: {len(cleaned_base64)})")
-                try:
-                    icon_data = base64.b64decode(cleaned_base64)
-                    image = Image.open(io.BytesIO(icon_data))
-                    file_path = os.path.join(app_icons_directory(), f"{package}.png")
-                    image.save(file_path, "PNG")
-                    AppState().app_icons[package] = file_path
-                except (base64.binascii.Error, Exception) as e:
-                    logger.error(f"Error decoding app icon for {package}: {e}")
-                    logger.error(f"Problematic string (first 100 chars): {cleaned_base64[:100]}...")
-                    logger.error(f"Length of problematic string: {len(cleaned_base64)}")
-            AppState().app_icons_changed.emit()
-        elif message_type == "clipboardUpdate":
-            AppState().update_clipboard_from_android(data.get("text"))
-        elif message_type == "wallpaperImage":
-            base64_string = data.get("wallpaper")
-            print(f"Received wallpaper image data: {base64_string[:50]}...")
-            if base64_string:
-                AppState().save_wallpaper_from_base64(base64_string)
-
-    def send_message(self, message):
+        except TransferError as e:
+            self._reply(session, {"type": "transferError", "data": {"id": data.get("id"), "reason": str(e)}})
+            return
+        if transfer.resuming:
+            self._spawn(self._resume_transfer(transfer, session))
+        else:
+            self._ack_transfer_begin(transfer, session)
+
+    async def _resume_transfer(self, transfer, session):
+        try:
+            await self.transfers.resume(transfer)
+        except OSError as e:
+            logger.warning("Could not resume transfer %s: %s", transfer.id, e)
+            self._reply(session, {"type": "transferError", "data": {"id": transfer.id, "reason": str(e)}})
+            return
+        self._ack_transfer_begin(transfer, session)
+
+    def _ack_transfer_begin(self, transfer, session):
+        self._reply(session, {
+            "type": "transferAck",
+            "data": {"id": transfer.id, "offset": transfer.offset, "chunkSize": Defaults.transfer_chunk_size},
+        })
+
+    def _handle_transfer_chunk(self, data, session):
+        require_object("transferChunk", data)
+        try:
+            chunk = base64.b64decode(require_string("transferChunk.data", data.get("data")), validate=True)
+        except binascii.Error as e:
+            raise MessageDecodeError(f"transferChunk.data is not valid base64: {e}") from e
+        self._write_transfer_chunk(data.get("id"), data.get("offset"), chunk, session)
+
+    def _handle_transfer_chunk_frame(self, transfer_id, payload, session):
+        if len(payload) < CHUNK_OFFSET.size:
+            logger.warning("Transfer chunk frame for %s is missing its offset", transfer_id)
+            return
+        offset, = CHUNK_OFFSET.unpack_from(payload)
+        self._write_transfer_chunk(transfer_id, offset, payload[CHUNK_OFFSET.size:], session)
+
+    def _write_transfer_chunk(self, transfer_id, offset, chunk, session):
+        try:
+            offset = self.transfers.write_chunk(self._transfer_owner(session), transfer_id, offset, chunk)
+        except (TransferError, OSError) as e:
+            self.transfers.abort(self._transfer_owner(session), transfer_id)
+            self._reply(session, {"type": "transferError", "data": {"id": transfer_id, "reason": str(e)}})
+            return
+        self._reply(session, {"type": "transferAck", "data": {"id": transfer_id, "offset": offset}})
+
+    def _handle_transfer_end(self, data, session):
+        transfer_id = require_object("transferEnd", data).get("id")
+        try:
+            transfer = self.transfers.finish(self._transfer_owner(session), transfer_id)
+        except TransferError as e:
+            self._reply(session, {"type": "transferError", "data": {"id": transfer_id, "reason": str(e)}})
+            return
+
+        handler = self.transfer_handlers.get(transfer.kind)
+        if handler is None:
+            logger.warning("Unknown transfer kind: %s", transfer.kind)
+            transfer.path.unlink(missing_ok=True)
+            self._reply(session, {"type": "transferError", "data": {"id": transfer_id, "reason": "unknown kind"}})
+            return
+        handler(transfer, session)
+        self._reply(session, {"type": "transferComplete", "data": {"id": transfer_id}})
+
+    def _handle_transfer_abort(self, data, session):
+        self.transfers.abort(self._transfer_owner(session), require_object("transferAbort", data).get("id"))
+
+    def _handle_transfer_ack(self, data, session):
+        require_object("transferAck", data)
+        transfer = self.outbound_transfers.get(data.get("id"))
+        if transfer:
+            transfer.ack(data.get("offset"))
+
+    def _handle_transfer_complete(self, data, session):
+        logger.debug("Device finished transfer %s", require_object("transferComplete", data).get("id"))
+
+    def _handle_transfer_error(self, data, session):
+        require_object("transferError", data)
+        transfer = self.outbound_transfers.get(data.get("id"))
+        if transfer:
+            transfer.fail(data.get("reason"))
+        else:
+            logger.warning("Device reported an error for transfer %s: %s", data.get("id"), data.get("reason"))
+
+    def _on_wallpaper_transferred(self, transfer, session):
+        self._save_wallpaper_file(session, transfer.path)
+
+    def _on_app_icons_transferred(self, transfer, session):
+        self._spawn(self._ingest_icon_file(transfer.path))
+
+    def _on_clipboard_transferred(self, transfer, session):
+        self._spawn(self._read_clipboard_file(transfer.path))
+
+    async def _read_clipboard_file(self, path):
+        loop = asyncio.get_running_loop()
+        try:
+            text = await loop.run_in_executor(None, path.read_text, "utf-8")
+        except (OSError, UnicodeDecodeError) as e:
+            logger.error("Error reading transferred clipboard: %s", e)
+            return
+        finally:
+            path.unlink(missing_ok=True)
+        self._receive_clipboard(text)
+
+    def _on_clipboard_image_transferred(self, transfer, session):
+        self._spawn(self._read_clipboard_image(transfer.path))
+
+    async def _read_clipboard_image(self, path):
+        loop = asyncio.get_running_loop()
+        try:
+            loaded = await loop.run_in_executor(None, load_image, path)
+        finally:
+            path.unlink(missing_ok=True)
+        if loaded is None:
+            logger.error("Transferred clipboard image could not be decoded")
+            return
+        self.clipboard_image_received.emit(*loaded)
+
+    def _on_clipboard_file_transferred(self, transfer, session):
+        parsed = parse_file_key(transfer.key)
+        if parsed is None:
+            logger.warning("Invalid clipboard file key: %s", transfer.key)
+            transfer.path.unlink(missing_ok=True)
+            return
+        batch, count, name = parsed
+        target = clipboard_directory() / batch / name
+        try:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            shutil.move(transfer.path, target)
+        except OSError as e:
+            logger.error("Error saving clipboard file %s: %s", name, e)
+            transfer.path.unlink(missing_ok=True)
+            return
+        self.clipboard_file_received.emit(batch, count, str(target))
+
+    async def _ingest_icon_file(self, path):
+        loop = asyncio.get_running_loop()
+        try:
+            icons = await loop.run_in_executor(self.icon_pipeline.executor, load_json_file, path)
+        except (OSError, ValueError) as e:
+            logger.error("Error reading transferred app icons: %s", e)
+            return
+        finally:
+            path.unlink(missing_ok=True)
+        if isinstance(icons, dict):
+            await self.icon_pipeline.ingest(icons, self.app_icons_updated.emit, self.app_icons_evicted.emit)
+
+    def _reply(self, session, message):
+        if session is not None:
+            session.enqueue(message)
+
+    def _spawn(self, coro):
+        task = asyncio.ensure_future(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        return task
+
+    def set_metrics_enabled(self, enabled: bool):
+        # the endpoint lives on the server's loop, which may be the IO thread's
+        if self.loop and self.server:
+            self.loop.call_soon_threadsafe(self._spawn, self._apply_metrics_enabled(enabled))
+
+    async def _apply_metrics_enabled(self, enabled):
+        if enabled and not self.metrics_endpoint.server:
+            await self.metrics_endpoint.start(AppState().metrics_port)
+        elif not enabled:
+            await self.metrics_endpoint.stop()
+
+    def send_message(self, message: dict, device_key: str = None):
         if self.loop:
-            asyncio.run_coroutine_threadsafe(self._send_message_async(message), self.loop)
+            target = device_key or AppState().active_device_key
+            self.loop.call_soon_threadsafe(self.coalescer.submit, message, target)
         else:
-            print("WebSocket event loop not available. Cannot send message.")
+            logger.warning("WebSocket event loop not available. Cannot send message.")
 
-    async def _send_message_async(self, message):
-        print(f"WebSocket sending: {message}")
-        if self.active_sessions:
-            await asyncio.gather(
-                *[session.send(message) for session in self.active_sessions]
-            )
+    def _send_to_device(self, message: dict, device_key: str = None):
+        logger.debug("WebSocket sending: %s", Payload(message))
+        if device_key is not None:
+            session = self.sessions_by_device.get(device_key)
+            suspended = self.resume.suspended_by_device.get(device_key)
+            if session:
+                session.enqueue(message)
+            elif suspended:
+                suspended.stamp(message)
+            else:
+                logger.info("No active WebSocket session for device %s.", device_key)
+        elif identified := [session for session in self.active_sessions if session.device_key]:
+            # a connection that has not sent its device message yet is not a device to send to
+            for session in identified:
+                session.enqueue(message)
         else:
-            print("No active WebSocket sessions to send message to.")
+            logger.info("No active WebSocket sessions to send message to.")
 
-    def send_disconnect_request(self):
+    def outbound_stats(self) -> list[dict]:
+        return [session.stats() for session in list(self.active_sessions)]
+
+    def send_disconnect_request(self, device_key: str = None):
         message = {"type": "disconnectRequest", "data": {}}
-        self.send_message(json.dumps(message))
+        device_key = device_key or AppState().active_device_key
+        self.send_message(message, device_key)
+        if self.loop:
+            self.loop.call_soon_threadsafe(self._forget_resume, device_key)
+
+    def _forget_resume(self, device_key):
+        session = self.sessions_by_device.get(device_key)
+        state = session.resume if session else self.resume.suspended_by_device.get(device_key)
+        if state:
+            self.resume.discard(state)
+        if session:
+            session.resume = None
 
     def dismiss_notification(self, nid):
         message = {"type": "dismissNotification", "data": {"id": nid}}
-        self.send_message(json.dumps(message))
+        self.send_message(message)
 
     def send_media_action(self, action):
         message = {"type": "mediaControl", "data": {"action": action}}
-        self.send_message(json.dumps(message))
+        self.send_message(message)
 
     def send_volume_action(self, action, volume=None):
         data = {"action": action}
         if volume is not None:
             data["volume"] = volume
         message = {"type": "volumeControl", "data": data}
-        self.send_message(json.dumps(message))
-
-    def send_clipboard_update(self, message):
         self.send_message(message)
+
+    def send_clipboard(self, payloads: list, device_key: str = None):
+        if self.loop:
+            target = device_key or AppState().active_device_key
+            self.loop.call_soon_threadsafe(self._send_clipboard, payloads, target)
+        else:
+            logger.warning("WebSocket event loop not available. Cannot send clipboard.")
+
+    def _send_clipboard(self, payloads, target):
+        if target is not None:
+            session = self.sessions_by_device.get(target)
+            sessions = [session] if session else []
+        else:
+            sessions = list(self.active_sessions)
+        for session in sessions:
+            stream = self._clipboard_streams.pop(session, None)
+            if stream:
+                stream.cancel()
+        if len(payloads) == 1 and payloads[0].is_text and payloads[0].size <= Defaults.clipboard_inline_size:
+            self.coalescer.submit(payloads[0].text_message(), target)
+            return
+        for session in sessions:
+            if session.protocol_version >= OUTBOUND_TRANSFER_PROTOCOL_VERSION:
+                self._clipboard_streams[session] = self._spawn(self._stream_clipboard(session, payloads))
+            elif payloads[0].is_text:
+                session.enqueue(payloads[0].text_message())
+            else:
+                logger.info("Device %s cannot receive %s transfers", session.device_key, payloads[0].kind)
+
+    async def _stream_clipboard(self, session, payloads):
+        try:
+            for payload in payloads:
+                if not await self._stream_payload(session, payload):
+                    return
+        finally:
+            if self._clipboard_streams.get(session) is asyncio.current_task():
+                del self._clipboard_streams[session]
+
+    async def _stream_payload(self, session, payload) -> bool:
+        loop = asyncio.get_running_loop()
+        chunk_size = Defaults.transfer_send_chunk_size
+        window = Defaults.transfer_send_window * chunk_size
+        transfer = OutboundTransfer(secrets.token_urlsafe(12), payload.size)
+        self.outbound_transfers[transfer.id] = transfer
+        session.enqueue({
+            "type": "transferBegin",
+            "data": {
+                "id": transfer.id,
+                "kind": payload.kind,
+                "key": payload.key,
+                "size": payload.size,
+                "checksum": payload.digest,
+                "chunkSize": chunk_size,
+            },
+        })
+        try:
+            # the device acks the begin with the offset to resume from, then every chunk it writes;
+            # at most a window of unacknowledged bytes is in flight, on top of the local queue limit
+            if not await transfer.wait_acked(0, Defaults.transfer_ack_timeout):
+                logger.warning("Device refused %s transfer: %s", payload.kind, transfer.error)
+                return True
+            offset = transfer.acked
+            while offset < payload.size:
+                if not await session.wait_writable(Defaults.transfer_send_window):
+                    return False
+                if not await transfer.wait_acked(offset + chunk_size - window, Defaults.transfer_ack_timeout):
+                    logger.warning("Device failed %s transfer: %s", payload.kind, transfer.error)
+                    return True
+                if payload.path:
+                    chunk = await loop.run_in_executor(None, payload.read, offset, chunk_size)
+                else:
+                    chunk = payload.read(offset, chunk_size)
+                if not chunk:
+                    raise OSError(f"file ended at {offset} of {payload.size} bytes")
+                frame = build_frame(FRAME_TRANSFER_CHUNK, transfer.id, CHUNK_OFFSET.pack(offset) + chunk)
+                session.enqueue_frame(FRAME_NAMES[FRAME_TRANSFER_CHUNK], frame)
+                offset += len(chunk)
+        except asyncio.TimeoutError:
+            # before OSError, which TimeoutError subclasses from Python 3.11
+            logger.warning("Device stopped acknowledging %s transfer %s", payload.kind, transfer.id)
+            session.enqueue({"type": "transferAbort", "data": {"id": transfer.id}})
+            return False
+        except OSError as e:
+            logger.error("Error reading clipboard file %s: %s", payload.path, e)
+            session.enqueue({"type": "transferAbort", "data": {"id": transfer.id}})
+            return True
+        except asyncio.CancelledError:
+            if not session.closed:
+                session.enqueue({"type": "transferAbort", "data": {"id": transfer.id}})
+            raise
+        finally:
+            del self.outbound_transfers[transfer.id]
+        session.enqueue({"type": "transferEnd", "data": {"id": transfer.id}})
+        return True
@@ -1,42 +1,98 @@
 import sys
+from app.core.startup import StartupProfile
+import argparse
 import asyncio
 from PySide6.QtWidgets import QApplication, QMainWindow
-from PySide6.QtCore import QTimer
+from PySide6.QtCore import QEvent, QTimer
+from qasync import QEventLoop
 
+from app.core.logging_setup import start_logging, apply_log_levels
 from app.core.app_state import AppState
 from app.core.websocket_server import WebSocketServer
+from app.core.io_thread import WebSocketIOThread
+from app.core.notification_history import NotificationHistory
 from app.ui.views.home_view import HomeView
 
 class AirSyncApp(QApplication):
-    def __init__(self, argv):
+    def __init__(self, argv, startup_report=False, startup_budget=None):
+        self.profile = StartupProfile()
+        self.profile.mark("imports")
         super().__init__(argv)
+        self.startup_report = startup_report
+        self.startup_budget = startup_budget
+        start_logging()
+        self.loop = QEventLoop(self)
+        asyncio.set_event_loop(self.loop)
+        self.profile.mark("qt application")
         self.app_state = AppState()
+        apply_log_levels(self.app_state.log_levels)
+        self.profile.mark("app state")
         self.websocket_server = WebSocketServer()
+        self.io_thread = None
         self.main_window = QMainWindow()
         self.home_view = HomeView()
         self.main_window.setCentralWidget(self.home_view)
         self.main_window.setWindowTitle("AirSync")
         self.main_window.resize(1000, 600)
+        self.profile.mark("window built")
+        self.main_window.installEventFilter(self)
         self.main_window.show()
-        self.loop = asyncio.get_event_loop()
-        self.timer = QTimer()
-        self.timer.timeout.connect(self._run_asyncio_tasks)
-        self.timer.start(10)
-        asyncio.ensure_future(self.websocket_server.start(port=self.app_state.port))
 
-    def _run_asyncio_tasks(self):
-        self.loop.call_soon(self.loop.stop)
-        self.loop.run_forever()
+    def eventFilter(self, watched, event):
+        if watched is self.main_window and event.type() == QEvent.Paint:
+            self.main_window.removeEventFilter(self)
+            self.profile.mark("first paint")
+            QTimer.singleShot(0, self._finish_startup)
+        return super().eventFilter(watched, event)
+
+    def _finish_startup(self):
+        if self.app_state.notification_history_enabled:
+            NotificationHistory().start()
+        self.loop.create_task(self.app_state.load_caches())
+        self.loop.create_task(self.app_state.refresh_local_ip_address())
+        if self.app_state.websocket_io_thread:
+            self.io_thread = WebSocketIOThread(self.websocket_server, port=self.app_state.port)
+            self.io_thread.start()
+        else:
+            self.loop.create_task(self.websocket_server.start(port=self.app_state.port))
+        self.profile.mark("deferred startup")
+        if self.startup_report or self.startup_budget is not None:
+            print(self.profile.report())
+        if self.startup_budget is not None:
+            first_paint = self.profile.elapsed("first paint") * 1000
+            over_budget = first_paint > self.startup_budget
+            print(f"First paint after {first_paint:.1f} ms, budget {self.startup_budget:.1f} ms: "
+                  f"{'over budget' if over_budget else 'ok'}")
+            self.exit(1 if over_budget else 0)
 
     def restart_websocket_server(self):
-        asyncio.ensure_future(self.websocket_server.stop())
-        asyncio.ensure_future(self.websocket_server.start(port=self.app_state.port))
+        if self.io_thread:
+            self.io_thread.restart(self.app_state.port)
+        else:
+            self.loop.create_task(self._restart_websocket_server())
+
+    async def _restart_websocket_server(self):
+        await self.websocket_server.stop()
+        await self.websocket_server.start(port=self.app_state.port)
+
+    def run(self):
+        with self.loop:
+            exit_code = self.loop.run_forever()
+            if self.io_thread:
+                self.io_thread.shutdown()
+            else:
+                self.loop.run_until_complete(self.websocket_server.stop())
+        NotificationHistory().close()
+        self.app_state.flush_settings()
+        return exit_code
 
-    def closeEvent(self, event):
-        asyncio.ensure_future(self.websocket_server.stop())
-        self.loop.call_soon_threadsafe(self.loop.stop)
-        super().closeEvent(event)
+def parse_startup_arguments(argv):
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--startup-report", action="store_true")
+    parser.add_argument("--startup-budget", type=float, metavar="MS")
+    return parser.parse_known_args(argv[1:])
 
 if __name__ == "__main__":
-    app = AirSyncApp(sys.argv)
-    sys.exit(app.exec())
\ No newline at end of file
+    options, qt_args = parse_startup_arguments(sys.argv)
+    app = AirSyncApp([sys.argv[0], *qt_args], options.startup_report, options.startup_budget)
+    sys.exit(app.run())
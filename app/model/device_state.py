@@ -0,0 +1,12 @@
+from dataclasses import dataclass, field
+
+from app.core.notification_store import NotificationStore
+from app.model.device import Device
+from app.model.device_status import DeviceStatus
+
+
+@dataclass
+class DeviceState:
+    device: Device
+    status: DeviceStatus | None = None
+    notifications: NotificationStore = field(default_factory=NotificationStore)
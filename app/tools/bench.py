@@ -0,0 +1,535 @@
+import argparse
+import asyncio
+import base64
+import contextlib
+import io
+import json
+import logging
+import os
+import socket
+import sys
+import threading
+import time
+
+from app.tools.harness import ms, offscreen_home, percentile
+
+FRAME_INTERVAL = 1 / 60
+
+SCENARIOS = {}
+
+
+def scenario(name, description):
+    def register(function):
+        SCENARIOS[name] = (function, description)
+        return function
+    return register
+
+
+def rate_row(name, count, elapsed, **extra) -> dict:
+    return {
+        "case": name,
+        "count": count,
+        "seconds": round(elapsed, 4),
+        "per_second": round(count / elapsed, 1) if elapsed else None,
+        "us_each": round(elapsed / count * 1e6, 2) if count else None,
+        **extra,
+    }
+
+
+def timed(function, count) -> float:
+    started = time.perf_counter()
+    for _ in range(count):
+        function()
+    return time.perf_counter() - started
+
+
+def run_on_qt_loop(coro):
+    from PySide6.QtGui import QGuiApplication
+    from qasync import QEventLoop
+
+    # the same loop the app runs on, so Qt timers and asyncio work share one thread
+    loop = QEventLoop(QGuiApplication.instance())
+    asyncio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+        asyncio.set_event_loop(None)
+
+
+def free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def latency_row(name, samples, **extra) -> dict:
+    return {
+        "case": name,
+        "count": len(samples),
+        "p50_ms": ms(percentile(samples, 50)),
+        "p99_ms": ms(percentile(samples, 99)),
+        "max_ms": ms(max(samples, default=None)),
+        **extra,
+    }
+
+
+class FrameProbe:
+    def __init__(self, interval=FRAME_INTERVAL):
+        from PySide6.QtCore import QTimer, Qt
+
+        self.intervals = []
+        self._last = None
+        self._timer = QTimer()
+        self._timer.setTimerType(Qt.PreciseTimer)
+        self._timer.setInterval(round(interval * 1000))
+        self._timer.timeout.connect(self._tick)
+
+    def _tick(self):
+        now = time.perf_counter()
+        if self._last is not None:
+            self.intervals.append(now - self._last)
+        self._last = now
+
+    def __enter__(self):
+        self._last = time.perf_counter()
+        self._timer.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._timer.stop()
+        self._tick()
+
+    def stats(self) -> dict:
+        return {
+            "frame_p50_ms": ms(percentile(self.intervals, 50)),
+            "frame_p99_ms": ms(percentile(self.intervals, 99)),
+            "frame_max_ms": ms(max(self.intervals, default=None)),
+        }
+
+
+def png_bytes(size=96) -> bytes:
+    from PIL import Image
+
+    # noise, so every icon is distinct and does not compress away to nothing
+    image = Image.frombytes("RGB", (size, size), os.urandom(size * size * 3))
+    buffer = io.BytesIO()
+    image.save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def sample_icons(count, prefix) -> dict:
+    return {f"com.bench.{prefix}{n}": png_bytes() for n in range(count)}
+
+
+class BenchSocket:
+    remote_address = ("127.0.0.1", 0)
+
+
+def bench_server():
+    from app.core.session import Session
+    from app.core.websocket_server import WebSocketServer
+
+    server = WebSocketServer()
+    session = Session(BenchSocket())
+    server.handle_message({"type": "device", "data": {"name": "Bench", "ipAddress": "127.0.0.1", "port": 1}}, session)
+    return server, session
+
+
+def finish_bench_server(server, session):
+    from app.core.app_state import AppState
+
+    session.close()
+    AppState().native_notifier.clear()
+
+
+def sample_messages() -> dict:
+    return {
+        "notification": {"type": "notification", "data": {
+            "title": "Message", "body": "Benchmark notification body " + "lorem ipsum " * 8,
+            "app": "Messages", "id": "1", "package": "com.google.android.apps.messaging",
+        }},
+        "status": {"type": "status", "data": {
+            "battery": {"level": 80, "isCharging": False},
+            "isPaired": True,
+            "music": {"isPlaying": True, "title": "Track", "artist": "Artist", "volume": 7, "isMuted": False},
+        }},
+        "statusPatch": {"type": "statusPatch", "data": {"battery": {"level": 79}}},
+        "ping": {"type": "ping", "data": {"seq": 1}},
+    }
+
+
+@scenario("dispatch", "messages per second through WebSocketServer._dispatch, per message type")
+def bench_dispatch(options) -> list[dict]:
+    async def run():
+        server, session = bench_server()
+        frames = {name: json.dumps(message) for name, message in sample_messages().items()}
+        frames["unknown"] = json.dumps({"type": "bogus", "data": {}})
+        frames["malformed"] = json.dumps({"type": "notification", "data": []})
+        frames["invalid"] = "{not json"
+        rows = []
+        for name, frame in frames.items():
+            # replies are discarded as they are queued so ping measures dispatch, not a full queue
+            elapsed = timed(lambda: (server._dispatch(frame, session), session.queue.clear()), options.iterations)
+            rows.append(rate_row(name, options.iterations, elapsed, bytes=len(frame)))
+        finish_bench_server(server, session)
+        return rows
+
+    return asyncio.run(run())
+
+
+@scenario("icons", "appIcons throughput and 60 Hz Qt frame intervals during a full icon sync")
+def bench_icons(options) -> list[dict]:
+    from app.core.icon_pipeline import IconPipeline, decode_icon, prepare_icons
+
+    async def sync(pipeline, icons):
+        with FrameProbe() as probe:
+            started = time.perf_counter()
+            await pipeline.ingest(icons, lambda saved: None)
+            elapsed = time.perf_counter() - started
+        return elapsed, probe
+
+    async def inline(pipeline, icons):
+        # what appIcons cost when every icon was decoded on the loop thread
+        with FrameProbe() as probe:
+            started = time.perf_counter()
+            for package, digest, icon in prepare_icons(icons):
+                decode_icon(pipeline.store.path_for(digest), package, digest, icon)
+                await asyncio.sleep(0)
+            elapsed = time.perf_counter() - started
+        return elapsed, probe
+
+    async def idle(seconds):
+        with FrameProbe() as probe:
+            await asyncio.sleep(seconds)
+        return seconds, probe
+
+    async def run():
+        pipeline = IconPipeline()
+        cold = {package: base64.b64encode(icon).decode() for package, icon in sample_icons(options.icons, "cold").items()}
+        rows = []
+        elapsed, probe = await sync(pipeline, cold)
+        rows.append(rate_row("cold sync", len(cold), elapsed, **probe.stats()))
+        elapsed, probe = await sync(pipeline, cold)
+        rows.append(rate_row("warm sync", len(cold), elapsed, **probe.stats()))
+        inline_icons = {package: base64.b64encode(icon).decode() for package, icon in sample_icons(options.icons, "inline").items()}
+        elapsed, probe = await inline(pipeline, inline_icons)
+        rows.append(rate_row("on loop thread", len(inline_icons), elapsed, **probe.stats()))
+        _, probe = await idle(rows[0]["seconds"])
+        rows.append({"case": "idle", **probe.stats()})
+        pipeline.shutdown()
+        return rows
+
+    return run_on_qt_loop(run())
+
+
+@scenario("icon-frames", "base64-in-JSON vs binary frames for appIcons and wallpapers, through the server")
+def bench_icon_frames(options) -> list[dict]:
+    from app.core.binary_frame import FRAME_APP_ICON, FRAME_WALLPAPER, build_frame
+
+    async def settle(server):
+        while server._background_tasks:
+            await asyncio.gather(*server._background_tasks)
+
+    async def flush_frames(server):
+        # skip the batching window; the frames are all in already
+        server._icon_flush_handle.cancel()
+        server._flush_icon_frames()
+        await settle(server)
+
+    async def icon_sync(server, session, frames, flush):
+        started = time.perf_counter()
+        for frame in frames:
+            server._dispatch(frame, session)
+        await flush(server)
+        return time.perf_counter() - started
+
+    def throughput_row(name, count, elapsed, wire_bytes):
+        return rate_row(name, count, elapsed, wire_bytes=wire_bytes,
+                        mb_per_second=round(wire_bytes / elapsed / 1e6, 1) if elapsed else None)
+
+    async def run():
+        server, session = bench_server()
+        rows = []
+        icons = {package: base64.b64encode(icon).decode() for package, icon in sample_icons(options.icons, "json").items()}
+        frames = [json.dumps({"type": "appIcons", "data": icons})]
+        elapsed = await icon_sync(server, session, frames, settle)
+        rows.append(throughput_row("icons json", len(icons), elapsed, sum(len(frame.encode()) for frame in frames)))
+
+        frames = [build_frame(FRAME_APP_ICON, package, icon) for package, icon in sample_icons(options.icons, "binary").items()]
+        elapsed = await icon_sync(server, session, frames, flush_frames)
+        rows.append(throughput_row("icons binary", len(frames), elapsed, sum(map(len, frames))))
+
+        wallpaper = png_bytes(512)
+        count = max(1, options.iterations // 1000)
+        frame = json.dumps({"type": "wallpaperImage", "data": {"wallpaper": base64.b64encode(wallpaper).decode()}})
+        elapsed = timed(lambda: server._dispatch(frame, session), count)
+        rows.append(throughput_row("wallpaper json", count, elapsed, len(frame.encode()) * count))
+        frame = build_frame(FRAME_WALLPAPER, "", wallpaper)
+        elapsed = timed(lambda: server._dispatch(frame, session), count)
+        rows.append(throughput_row("wallpaper binary", count, elapsed, len(frame) * count))
+
+        finish_bench_server(server, session)
+        return rows
+
+    return asyncio.run(run())
+
+
+@scenario("loop", "qasync loop wake-up and WebSocket round-trip latency, and idle CPU")
+def bench_loop(options) -> list[dict]:
+    import websockets
+
+    from app.core.websocket_server import WebSocketServer
+
+    async def call_soon_latency():
+        loop = asyncio.get_running_loop()
+        samples = []
+        for _ in range(options.samples):
+            ran = loop.create_future()
+            loop.call_soon(ran.set_result, time.perf_counter())
+            samples.append(time.perf_counter() - await ran)
+            await asyncio.sleep(0.001)
+        return samples
+
+    async def threadsafe_latency():
+        # an idle loop woken from another thread, as the IO thread and executors do
+        loop = asyncio.get_running_loop()
+        samples = []
+
+        def wake(ran):
+            time.sleep(0.002)
+            loop.call_soon_threadsafe(lambda sent_at: ran.done() or ran.set_result(sent_at), time.perf_counter())
+
+        for _ in range(options.samples):
+            ran = loop.create_future()
+            threading.Thread(target=wake, args=(ran,)).start()
+            sent_at = await ran
+            samples.append(time.perf_counter() - sent_at)
+        return samples
+
+    async def round_trip_latency(uri):
+        samples = []
+        async with websockets.connect(uri) as websocket:
+            for seq in range(options.samples):
+                sent_at = time.perf_counter()
+                await websocket.send(json.dumps({"type": "ping", "data": {"seq": seq}}))
+                while json.loads(await websocket.recv()).get("type") != "pong":
+                    pass
+                samples.append(time.perf_counter() - sent_at)
+        return samples
+
+    async def idle_cpu(seconds=1.0):
+        started, cpu_started = time.perf_counter(), time.process_time()
+        await asyncio.sleep(seconds)
+        return (time.process_time() - cpu_started) / (time.perf_counter() - started) * 100
+
+    async def run():
+        port = free_port()
+        server = WebSocketServer()
+        await server.start(port=port)
+        try:
+            return [
+                latency_row("call_soon", await call_soon_latency()),
+                latency_row("threadsafe wake-up", await threadsafe_latency()),
+                latency_row("ping round trip", await round_trip_latency(f"ws://127.0.0.1:{port}")),
+                {"case": "idle", "cpu_percent": round(await idle_cpu(), 2)},
+            ]
+        finally:
+            await server.stop()
+
+    return run_on_qt_loop(run())
+
+
+@scenario("codec", "encode/decode cost and bytes on the wire per negotiated encoding")
+def bench_codec(options) -> list[dict]:
+    from app.core.message_codec import CODECS
+
+    rows = []
+    messages = sample_messages()
+    for name in ("status", "notification"):
+        message = messages[name]
+        for codec in CODECS.values():
+            frame = codec.encode(message)
+            size = len(frame.encode()) if isinstance(frame, str) else len(frame)
+            encode = timed(lambda: codec.encode(message), options.iterations)
+            decode = timed(lambda: codec.decode(frame), options.iterations)
+            rows.append({
+                "case": f"{name} {codec.name}",
+                "count": options.iterations,
+                "encode_us": round(encode / options.iterations * 1e6, 2),
+                "decode_us": round(decode / options.iterations * 1e6, 2),
+                "bytes": size,
+            })
+    return rows
+
+
+@scenario("deflate", "permessage-deflate CPU cost against bytes saved, per setting and payload, over loopback")
+def bench_deflate(options) -> list[dict]:
+    import websockets
+
+    from app.core.app_state import AppState
+    from app.core.binary_frame import FRAME_APP_ICON, build_frame
+    from app.core.websocket_server import WebSocketServer
+
+    settings = {
+        "off": {"compression_enabled": False},
+        "level 1": {"compression_level": 1},
+        "default": {},
+        "level 9": {"compression_level": 9, "compression_window_bits": 15, "compression_mem_level": 8},
+    }
+    notification = sample_messages()["notification"]
+    icons = [build_frame(FRAME_APP_ICON, f"com.bench.app{n}", png_bytes()) for n in range(16)]
+
+    # every message differs, so the shared compression context cannot just replay the previous one
+    def notifications(session, n):
+        session.enqueue({**notification, "data": {**notification["data"], "id": str(n), "title": f"Message {n}"}})
+
+    def manifests(session, n):
+        session.enqueue({"type": "appIconManifest", "data": {
+            f"com.bench.app{i}": os.urandom(16).hex() for i in range(options.icons)
+        }})
+
+    payloads = {
+        "notification": notifications,
+        "icon manifest": manifests,
+        "png frame": lambda session, n: session.enqueue_frame("appIcon", icons[n % len(icons)]),
+        "png frame forced": lambda session, n: session.enqueue_frame("appIcon", icons[n % len(icons)], compress=True),
+    }
+
+    async def measure(uri, server, send):
+        async with websockets.connect(uri, max_size=None) as websocket:
+            while not server.active_sessions:
+                await asyncio.sleep(0.001)
+            session = next(iter(server.active_sessions))
+            raw_bytes = 0
+            started = time.perf_counter()
+            for n in range(options.samples):
+                send(session, n)
+                raw_bytes += len(session.queue[-1][1])
+                await websocket.recv()
+            elapsed = time.perf_counter() - started
+            stats = session.deflate.stats() if session.deflate else {}
+        wire_bytes = stats.get("compressed_bytes", 0) + stats.get("skipped_bytes", raw_bytes)
+        compress_seconds = stats.get("compress_seconds", 0.0)
+        return {
+            "count": options.samples,
+            "seconds": round(elapsed, 4),
+            "raw_bytes": raw_bytes,
+            "wire_bytes": wire_bytes,
+            "saved_percent": round((1 - wire_bytes / raw_bytes) * 100, 1),
+            "compress_us": round(compress_seconds / options.samples * 1e6, 2),
+        }
+
+    async def run():
+        app_state = AppState()
+        defaults = {name: getattr(app_state, name) for name in (
+            "compression_enabled", "compression_level", "compression_window_bits", "compression_mem_level")}
+        rows = []
+        for setting, overrides in settings.items():
+            for name, value in {**defaults, **overrides}.items():
+                setattr(app_state, name, value)
+            port = free_port()
+            server = WebSocketServer()
+            await server.start(port=port)
+            try:
+                for payload, send in payloads.items():
+                    row = await measure(f"ws://127.0.0.1:{port}", server, send)
+                    rows.append({"case": f"{setting} {payload}", **row})
+            finally:
+                await server.stop()
+        for name, value in defaults.items():
+            setattr(app_state, name, value)
+        return rows
+
+    return asyncio.run(run())
+
+
+@scenario("devices", "ping round trip and throughput as more simulated phones connect")
+def bench_devices(options) -> list[dict]:
+    from app.core.app_state import AppState
+    from app.core.websocket_server import WebSocketServer
+
+    async def simulate(port, devices):
+        # the phones run in their own process so their encoding work does not load the server's loop.
+        # Icons and wallpapers stay off: a megabyte frame holds up pings behind it on the same socket,
+        # which the icons and icon-frames scenarios cover; this one is about per-device messaging.
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, "-m", "app.tools.simulator", "--port", str(port), "--json",
+            "--devices", str(devices), "--duration", str(options.duration),
+            "--icons", "0", "--wallpapers", "0", "--ping-interval", "0.02",
+            stdout=asyncio.subprocess.PIPE,
+        )
+        output, _ = await process.communicate()
+        if process.returncode:
+            raise RuntimeError(f"simulator exited with status {process.returncode}")
+        return json.loads(output)
+
+    async def run():
+        port = free_port()
+        server = WebSocketServer()
+        await server.start(port=port)
+        rows = []
+        try:
+            for devices in options.device_counts:
+                report = await simulate(port, devices)
+                rows.append({
+                    "case": f"{devices} devices",
+                    "messages": sum(report["sent"].values()),
+                    "per_second": report["messages_per_second"],
+                    "rtt_p50_ms": report["rtt_p50_ms"],
+                    "rtt_p99_ms": report["rtt_p99_ms"],
+                })
+        finally:
+            await server.stop()
+            AppState().native_notifier.clear()
+        return rows
+
+    return asyncio.run(run())
+
+
+def print_rows(name, description, rows):
+    print(f"{name}: {description}")
+    columns = list(dict.fromkeys(key for row in rows for key in row))
+    widths = {column: max(len(column), *(len(str(row.get(column, ""))) for row in rows)) for column in columns}
+    print("  " + "  ".join(column.ljust(widths[column]) for column in columns))
+    for row in rows:
+        print("  " + "  ".join(str(row.get(column, "")).ljust(widths[column]) for column in columns))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m app.tools.bench",
+        description="Micro-benchmarks for the desktop side of the AirSync protocol.",
+    )
+    parser.add_argument("scenarios", nargs="*", choices=[[], *SCENARIOS], default=[],
+                        help=f"scenarios to run (default: all): {', '.join(SCENARIOS)}")
+    parser.add_argument("--iterations", type=int, default=20000, help="iterations per measured case")
+    parser.add_argument("--samples", type=int, default=500, help="samples per latency case")
+    parser.add_argument("--icons", type=int, default=200, help="icons per appIcons sync")
+    parser.add_argument("--device-counts", type=lambda value: [int(n) for n in value.split(",")], default=[1, 2, 4, 8],
+                        help="comma-separated numbers of simulated phones for the devices scenario")
+    parser.add_argument("--duration", type=float, default=3.0, help="seconds of simulated load per device count")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    options = parse_args(argv)
+    # unknown and malformed cases warn on every message; measure dispatch, not the log handler
+    logging.disable(logging.WARNING)
+    report = {}
+    with offscreen_home():
+        for name in options.scenarios or SCENARIOS:
+            function, description = SCENARIOS[name]
+            # AppState prints progress, e.g. every saved wallpaper; keep it out of the report
+            with contextlib.redirect_stdout(io.StringIO()):
+                report[name] = function(options)
+            if not options.json:
+                print_rows(name, description, report[name])
+    if options.json:
+        print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    main()
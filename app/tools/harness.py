@@ -0,0 +1,107 @@
+import asyncio
+import io
+import json
+import os
+import resource
+import statistics
+import sys
+import tempfile
+from contextlib import contextmanager, redirect_stdout
+
+from app.constants import Defaults
+
+
+def current_rss_kb() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1]
+
+
+def ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 3)
+
+
+def add_server_arguments(parser):
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=Defaults.server_port)
+    parser.add_argument("--serve", action="store_true",
+                        help="start an in-process server with a throwaway home directory")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+
+
+def silence_native_notifications():
+    from app.core.app_state import AppState
+    from app.core.native_notifier import TokenBucket
+
+    # simulated traffic must never reach the developer's desktop: every notification is held back.
+    # AppState announces itself on stdout, which would end up in front of a --json report
+    with redirect_stdout(io.StringIO()):
+        notifier = AppState().native_notifier
+    notifier.bucket = TokenBucket(0, 0)
+    return notifier
+
+
+@contextmanager
+def offscreen_home():
+    from PySide6.QtGui import QGuiApplication
+
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    app = QGuiApplication(sys.argv[:1])
+    try:
+        with tempfile.TemporaryDirectory(prefix="airsync-harness-") as home:
+            os.environ["HOME"] = home
+            notifier = silence_native_notifications()
+            try:
+                yield app
+            finally:
+                notifier.clear()
+    finally:
+        app.shutdown()
+
+
+def run_client(options, client, print_report):
+    if options.serve:
+        with offscreen_home():
+            report = asyncio.run(_serve_and_run(options.port, client))
+    else:
+        report = asyncio.run(client(f"ws://{options.host}:{options.port}"))
+
+    if options.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+        print_server_metrics(report)
+    return report
+
+
+async def _serve_and_run(port, client) -> dict:
+    from app.core.websocket_server import WebSocketServer
+    from app.core.metrics import Metrics
+
+    server = WebSocketServer()
+    await server.start(port=port)
+    try:
+        report = await client(f"ws://127.0.0.1:{port}")
+    finally:
+        await server.stop()
+    report["server_metrics"] = [
+        {**entry, "p50": ms(entry["p50"]), "p99": ms(entry["p99"])} for entry in Metrics().snapshot()
+    ]
+    report["server_outbound"] = server.coalescer.stats()
+    return report
+
+
+def print_server_metrics(report):
+    for entry in report.get("server_metrics", []):
+        print(f"  server {entry['direction']:<3} {entry['type']:<18} count {entry['count']:<7} "
+              f"bytes {entry['bytes']:<10} p50 <={entry['p50']} ms  p99 <={entry['p99']} ms")
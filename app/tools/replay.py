@@ -0,0 +1,157 @@
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+import websockets
+
+from app.core.message_codec import CODECS
+from app.core.session_recording import RecordingError, read_recording
+from app.tools.harness import add_server_arguments, current_rss_kb, ms, run_client
+
+DRAIN_TIMEOUT = 30
+DRAIN_PING = {"type": "ping", "data": {"seq": "replay-drain"}}
+
+
+def load_inbound_frames(path):
+    return [(timestamp, frame) for timestamp, outbound, frame in read_recording(path) if not outbound]
+
+
+def decode_reply(frame):
+    if isinstance(frame, str):
+        return json.loads(frame)
+    for codec in CODECS.values():
+        if codec.binary:
+            try:
+                return codec.decode(frame)
+            except ValueError:
+                pass
+    return None
+
+
+class Replay:
+    def __init__(self, path, frames, speed):
+        self.path = path
+        self.frames = frames
+        self.speed = speed
+        self.sent_bytes = 0
+        self.received = {}
+        self.send_elapsed = None
+        self.drain_elapsed = None
+
+    async def run(self, uri):
+        async with websockets.connect(uri, max_size=None) as websocket:
+            drained = asyncio.get_running_loop().create_future()
+            reader = asyncio.ensure_future(self._read_loop(websocket, drained))
+            started = time.perf_counter()
+            await self._send_frames(websocket)
+            self.send_elapsed = time.perf_counter() - started
+            await websocket.send(json.dumps(DRAIN_PING))
+            try:
+                await asyncio.wait_for(drained, DRAIN_TIMEOUT)
+                self.drain_elapsed = time.perf_counter() - started
+            except asyncio.TimeoutError:
+                print(f"{self.path}: server did not drain within {DRAIN_TIMEOUT}s", file=sys.stderr)
+            reader.cancel()
+
+    async def _send_frames(self, websocket):
+        if not self.frames:
+            return
+        loop = asyncio.get_running_loop()
+        origin = self.frames[0][0]
+        started = loop.time()
+        for timestamp, frame in self.frames:
+            if self.speed > 0:
+                delay = started + (timestamp - origin) / self.speed - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            await websocket.send(frame)
+            self.sent_bytes += len(frame)
+
+    async def _read_loop(self, websocket, drained):
+        async for frame in websocket:
+            try:
+                message = decode_reply(frame)
+            except ValueError:
+                continue
+            if not isinstance(message, dict):
+                continue
+            message_type = message.get("type")
+            self.received[message_type] = self.received.get(message_type, 0) + 1
+            if message_type == "pong" and message.get("data") == DRAIN_PING["data"] and not drained.done():
+                drained.set_result(None)
+
+    def report(self) -> dict:
+        recorded = self.frames[-1][0] - self.frames[0][0] if self.frames else 0
+        elapsed = self.drain_elapsed or self.send_elapsed or 0
+        return {
+            "recording": str(self.path),
+            "frames": len(self.frames),
+            "bytes": self.sent_bytes,
+            "recorded_seconds": round(recorded, 3),
+            "send_ms": ms(self.send_elapsed),
+            "drained_ms": ms(self.drain_elapsed),
+            "frames_per_second": round(len(self.frames) / elapsed, 1) if elapsed else None,
+            "received": self.received,
+        }
+
+
+async def replay(options, recordings, uri) -> dict:
+    rss_before = current_rss_kb()
+    replays = [
+        Replay(path, frames, options.speed)
+        for _ in range(options.repeat)
+        for path, frames in recordings
+    ]
+    started = time.perf_counter()
+    await asyncio.gather(*(r.run(uri) for r in replays))
+    elapsed = time.perf_counter() - started
+    total_frames = sum(len(r.frames) for r in replays)
+    return {
+        "speed": options.speed,
+        "elapsed_seconds": round(elapsed, 3),
+        "frames": total_frames,
+        "frames_per_second": round(total_frames / elapsed, 1) if elapsed else None,
+        "replays": [r.report() for r in replays],
+        "rss_before_kb": rss_before,
+        "rss_after_kb": current_rss_kb(),
+    }
+
+
+def print_report(report):
+    speed = "max" if report["speed"] <= 0 else f"{report['speed']:g}x"
+    print(f"speed: {speed}  elapsed: {report['elapsed_seconds']}s  "
+          f"frames: {report['frames']}  {report['frames_per_second']} frames/s")
+    for entry in report["replays"]:
+        print(f"  {entry['recording']}: {entry['frames']} frames, {entry['bytes']} bytes, "
+              f"recorded {entry['recorded_seconds']}s, sent in {entry['send_ms']} ms, "
+              f"drained in {entry['drained_ms']} ms")
+    print(f"rss: {report['rss_before_kb']} kB -> {report['rss_after_kb']} kB "
+          f"({report['rss_after_kb'] - report['rss_before_kb']:+d} kB)")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m app.tools.replay",
+        description="Replay recorded AirSync sessions into a desktop WebSocket server.",
+    )
+    parser.add_argument("recordings", nargs="+", help="session recordings (.asrec) to replay concurrently")
+    add_server_arguments(parser)
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="playback speed multiplier, 0 replays as fast as possible")
+    parser.add_argument("--repeat", type=int, default=1, help="concurrent copies of each recording")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    options = parse_args(argv)
+    try:
+        recordings = [(path, load_inbound_frames(path)) for path in options.recordings]
+    except (OSError, RecordingError) as e:
+        sys.exit(f"Cannot load recording: {e}")
+    run_client(options, lambda uri: replay(options, recordings, uri), print_report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+import argparse
+import asyncio
+import base64
+import io
+import itertools
+import json
+import os
+import sys
+import time
+
+import websockets
+from PIL import Image
+
+from app.constants import Defaults
+from app.core.message_codec import CODECS, JSON_CODEC, PROTOCOL_VERSION
+from app.tools.harness import add_server_arguments, current_rss_kb, ms, percentile, run_client
+
+PING_TIMEOUT = 10
+
+
+def png_base64(size, seed, noise=False) -> str:
+    if noise:
+        image = Image.frombytes("RGB", size, os.urandom(size[0] * size[1] * 3))
+    else:
+        image = Image.new("RGB", size, (seed * 37 % 256, seed * 91 % 256, seed * 151 % 256))
+    buffer = io.BytesIO()
+    image.save(buffer, "PNG")
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
+class SimulationStats:
+    def __init__(self):
+        self.sent = {}
+        self.sent_bytes = 0
+        self.received = {}
+        self.round_trips = []
+
+    def record_sent(self, message_type, size):
+        self.sent[message_type] = self.sent.get(message_type, 0) + 1
+        self.sent_bytes += size
+
+    def record_received(self, message_type):
+        self.received[message_type] = self.received.get(message_type, 0) + 1
+
+
+class SimulatedDevice:
+    def __init__(self, index, options, stats):
+        self.index = index
+        self.options = options
+        self.stats = stats
+        self.codec = JSON_CODEC
+        self.websocket = None
+        self.counter = itertools.count(1)
+        self.pings = {}
+        self.icons = {
+            f"com.simulator.app{n}": png_base64((96, 96), n) for n in range(options.icon_batch)
+        }
+        self.wallpaper = png_base64((options.wallpaper_size, options.wallpaper_size), index, noise=True)
+
+    async def run(self, uri):
+        async with websockets.connect(uri, max_size=None) as websocket:
+            self.websocket = websocket
+            await self._handshake()
+            reader = asyncio.ensure_future(self._read_loop())
+            producers = [
+                asyncio.ensure_future(self._every(rate, send))
+                for rate, send in (
+                    (self.options.notifications, self._send_notification),
+                    (self.options.status, self._send_status),
+                    (self.options.icons, self._send_icons),
+                    (self.options.wallpapers, self._send_wallpaper),
+                    (self.options.clipboard, self._send_clipboard),
+                    (1 / self.options.ping_interval, self._send_ping),
+                )
+                if rate > 0
+            ]
+            await asyncio.sleep(self.options.duration)
+            for task in producers:
+                task.cancel()
+            await asyncio.gather(*producers, return_exceptions=True)
+            await self._drain()
+            reader.cancel()
+
+    async def _handshake(self):
+        await self.websocket.send(json.dumps({
+            "type": "hello",
+            "data": {"protocolVersion": PROTOCOL_VERSION, "encodings": [self.options.encoding]},
+        }))
+        ack = JSON_CODEC.decode(await self.websocket.recv())
+        self.codec = CODECS.get(ack.get("data", {}).get("encoding"), JSON_CODEC)
+        await self._send({"type": "device", "data": {
+            "name": f"Simulator {self.index}",
+            "ipAddress": f"127.0.0.{self.index + 1}",
+            "port": Defaults.server_port,
+        }})
+
+    async def _drain(self):
+        seq = next(self.counter)
+        waiter = asyncio.get_running_loop().create_future()
+        self.pings[seq] = (time.perf_counter(), waiter)
+        await self._send({"type": "ping", "data": {"seq": seq}})
+        try:
+            await asyncio.wait_for(waiter, PING_TIMEOUT)
+        except asyncio.TimeoutError:
+            print(f"device {self.index}: server did not drain within {PING_TIMEOUT}s", file=sys.stderr)
+
+    async def _every(self, rate, send):
+        loop = asyncio.get_running_loop()
+        interval = 1 / rate
+        next_at = loop.time()
+        while True:
+            await send()
+            next_at += interval
+            await asyncio.sleep(max(0, next_at - loop.time()))
+
+    async def _send(self, message):
+        frame = self.codec.encode(message)
+        await self.websocket.send(frame)
+        self.stats.record_sent(message["type"], len(frame))
+
+    async def _read_loop(self):
+        async for frame in self.websocket:
+            try:
+                message = self.codec.decode(frame) if isinstance(frame, bytes) else JSON_CODEC.decode(frame)
+            except ValueError:
+                continue
+            message_type = message.get("type")
+            self.stats.record_received(message_type)
+            if message_type == "pong":
+                self._on_pong(message.get("data") or {})
+
+    def _on_pong(self, data):
+        sent_at, waiter = self.pings.pop(data.get("seq"), (None, None))
+        if sent_at is None:
+            return
+        self.stats.round_trips.append(time.perf_counter() - sent_at)
+        if waiter and not waiter.done():
+            waiter.set_result(None)
+
+    async def _send_ping(self):
+        seq = next(self.counter)
+        self.pings[seq] = (time.perf_counter(), None)
+        await self._send({"type": "ping", "data": {"seq": seq}})
+
+    async def _send_notification(self):
+        n = next(self.counter)
+        await self._send({"type": "notification", "data": {
+            "title": f"Message {n}",
+            "body": f"Simulated notification body {n} " + "lorem ipsum " * 8,
+            "app": "Messages",
+            "id": str(n),
+            "package": "com.google.android.apps.messaging",
+        }})
+
+    async def _send_status(self):
+        n = next(self.counter)
+        await self._send({"type": "status", "data": {
+            "battery": {"level": 100 - n % 100, "isCharging": n % 2 == 0},
+            "isPaired": True,
+            "music": {"isPlaying": True, "title": "Simulated Track", "artist": "Simulator", "volume": n % 16, "isMuted": False},
+        }})
+
+    async def _send_icons(self):
+        await self._send({"type": "appIcons", "data": self.icons})
+
+    async def _send_wallpaper(self):
+        await self._send({"type": "wallpaperImage", "data": {"wallpaper": self.wallpaper}})
+
+    async def _send_clipboard(self):
+        await self._send({"type": "clipboardUpdate", "data": {"text": f"simulated clipboard {next(self.counter)}"}})
+
+
+async def simulate(options, uri) -> dict:
+    stats = SimulationStats()
+    rss_before = current_rss_kb()
+    started = time.perf_counter()
+    devices = [SimulatedDevice(index, options, stats) for index in range(options.devices)]
+    await asyncio.gather(*(device.run(uri) for device in devices))
+    elapsed = time.perf_counter() - started
+    total_sent = sum(stats.sent.values())
+    return {
+        "devices": options.devices,
+        "encoding": options.encoding,
+        "elapsed_seconds": round(elapsed, 3),
+        "sent": stats.sent,
+        "received": stats.received,
+        "sent_bytes": stats.sent_bytes,
+        "messages_per_second": round(total_sent / elapsed, 1),
+        "rtt_p50_ms": ms(percentile(stats.round_trips, 50)),
+        "rtt_p99_ms": ms(percentile(stats.round_trips, 99)),
+        "rss_before_kb": rss_before,
+        "rss_after_kb": current_rss_kb(),
+    }
+
+
+def print_report(report):
+    print(f"devices: {report['devices']}  encoding: {report['encoding']}  elapsed: {report['elapsed_seconds']}s")
+    print(f"sent: {sum(report['sent'].values())} messages, {report['sent_bytes']} bytes, "
+          f"{report['messages_per_second']} msg/s")
+    for message_type, count in sorted(report["sent"].items()):
+        print(f"  {message_type:<16} {count}")
+    print(f"received: {report['received']}")
+    print(f"round trip: p50 {report['rtt_p50_ms']} ms, p99 {report['rtt_p99_ms']} ms")
+    print(f"rss: {report['rss_before_kb']} kB -> {report['rss_after_kb']} kB "
+          f"({report['rss_after_kb'] - report['rss_before_kb']:+d} kB)")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m app.tools.simulator",
+        description="Simulate AirSync Android clients against a desktop WebSocket server.",
+    )
+    add_server_arguments(parser)
+    parser.add_argument("--devices", type=int, default=1)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to generate load")
+    parser.add_argument("--encoding", choices=sorted(CODECS), default=JSON_CODEC.name)
+    parser.add_argument("--notifications", type=float, default=20.0, help="notifications per second")
+    parser.add_argument("--status", type=float, default=1.0, help="status updates per second")
+    parser.add_argument("--icons", type=float, default=0.1, help="appIcons batches per second")
+    parser.add_argument("--icon-batch", type=int, default=32, help="icons per appIcons batch")
+    parser.add_argument("--wallpapers", type=float, default=0.05, help="wallpaper pushes per second")
+    parser.add_argument("--wallpaper-size", type=int, default=512, help="wallpaper edge length in pixels")
+    parser.add_argument("--clipboard", type=float, default=0.5, help="clipboard updates per second")
+    parser.add_argument("--ping-interval", type=float, default=0.1, help="seconds between latency probes")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    options = parse_args(argv)
+    run_client(options, lambda uri: simulate(options, uri), print_report)
+
+
+if __name__ == "__main__":
+    main()
@@ -11,6 +11,7 @@ from PySide6.QtGui import QIcon, QDesktopServices
 
 from app.core.app_state import AppState
 from app.ui.views.notification_view import NotificationListView
+from app.ui.views.history_view import HistoryView
 from app.ui.views.settings_view import SettingsView
 
 
@@ -28,8 +29,10 @@ class AppContentView(QWidget):
         )
         self.notification_view = NotificationListView()
         self.notification_list_scroll_area.setWidget(self.notification_view)
+        self.history_view = HistoryView()
         self.settings_view = SettingsView()
         self.tab_widget.addTab(self.notification_list_scroll_area, "Notifications")
+        self.tab_widget.addTab(self.history_view, "History")
         self.tab_widget.addTab(self.settings_view, "Settings")
         self.tab_widget.tabBar().setExpanding(True)
         self.tab_widget.setStyleSheet("QTabBar::tab { text-align: center; }")
@@ -49,13 +52,17 @@ class AppContentView(QWidget):
         if index == 0:
             self.app_state.selected_tab = "Notifications"
         elif index == 1:
+            self.app_state.selected_tab = "History"
+        elif index == 2:
             self.app_state.selected_tab = "Settings"
 
     def _update_selected_tab(self, tab_name):
         if tab_name == "Notifications":
             self.tab_widget.setCurrentIndex(0)
-        elif tab_name == "Settings":
+        elif tab_name == "History":
             self.tab_widget.setCurrentIndex(1)
+        elif tab_name == "Settings":
+            self.tab_widget.setCurrentIndex(2)
 
     def _open_feedback_link(self):
         QDesktopServices.openUrl(
@@ -12,12 +12,11 @@ class BatteryStatusView(QWidget):
         self.layout.setAlignment(Qt.AlignRight)
         self.battery_label = QLabel("N/A")
         self.layout.addWidget(self.battery_label)
-        self.app_state.status_changed.connect(self._update_status)
-        self._update_status()
+        self.app_state.battery_changed.connect(self._update_battery)
+        self._update_battery(self.app_state.status.battery if self.app_state.status else None)
 
-    def _update_status(self):
-        if self.app_state.status:
-            battery = self.app_state.status.battery
+    def _update_battery(self, battery):
+        if battery:
             self.battery_label.setText(f"{battery.level}% {'⚡️' if battery.is_charging else ''}")
         else:
             self.battery_label.setText("N/A")
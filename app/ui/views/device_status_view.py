@@ -14,16 +14,21 @@ class DeviceStatusView(QWidget):
         self.music_label = QLabel("Music: N/A")
         self.layout.addWidget(self.battery_label)
         self.layout.addWidget(self.music_label)
-        self.app_state.status_changed.connect(self._update_status)
-        self._update_status()
-
-    def _update_status(self):
-        if self.app_state.status:
-            battery = self.app_state.status.battery
-            music = self.app_state.status.music
+        self.app_state.battery_changed.connect(self._update_battery)
+        self.app_state.playback_changed.connect(self._update_music)
+        self.app_state.track_changed.connect(self._update_music)
+        status = self.app_state.status
+        self._update_battery(status.battery if status else None)
+        self._update_music(status.music if status else None)
 
+    def _update_battery(self, battery):
+        if battery:
             self.battery_label.setText(f"Battery: {battery.level}% {'⚡️ Charging' if battery.is_charging else ''}")
-            self.music_label.setText(f"Music: {music.title} by {music.artist} (Playing: {music.is_playing})")
         else:
             self.battery_label.setText("Battery: N/A")
+
+    def _update_music(self, music):
+        if music:
+            self.music_label.setText(f"Music: {music.title} by {music.artist} (Playing: {music.is_playing})")
+        else:
             self.music_label.setText("Music: N/A")
\ No newline at end of file
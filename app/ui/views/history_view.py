@@ -0,0 +1,106 @@
+from datetime import datetime
+
+from PySide6.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QLineEdit, QListView, QPushButton, QLabel, QMessageBox
+)
+from PySide6.QtCore import Qt, QTimer, QAbstractListModel, QModelIndex
+
+from app.constants import Defaults
+from app.core.app_state import AppState
+from app.core.notification_history import NotificationHistory
+
+
+class HistoryModel(QAbstractListModel):
+    def __init__(self):
+        super().__init__()
+        self.history = NotificationHistory()
+        self.rows = []
+        self.query = ""
+        self.device_key = None
+        self._exhausted = False
+
+    def reset(self, query: str = None, device_key: str = None):
+        self.beginResetModel()
+        if query is not None:
+            self.query = query
+        self.device_key = device_key
+        self.rows = []
+        self._exhausted = False
+        self.endResetModel()
+        self.fetchMore(QModelIndex())
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        before_id = self.rows[-1]["id"] if self.rows else None
+        page = self.history.page(self.query, self.device_key, before_id, Defaults.history_page_size)
+        if len(page) < Defaults.history_page_size:
+            self._exhausted = True
+        if page:
+            self.beginInsertRows(QModelIndex(), len(self.rows), len(self.rows) + len(page) - 1)
+            self.rows.extend(page)
+            self.endInsertRows()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self.rows[index.row()]
+        if role == Qt.DisplayRole:
+            posted = datetime.fromtimestamp(row["posted_at"]).strftime("%Y-%m-%d %H:%M")
+            return f"{row['app']} - {row['title']}\n{row['body']}\n{posted}"
+        if role == Qt.ToolTipRole:
+            return row["device_key"]
+        return None
+
+
+class HistoryView(QWidget):
+    def __init__(self):
+        super().__init__()
+        self.app_state = AppState()
+        self.main_layout = QVBoxLayout(self)
+        self.main_layout.setContentsMargins(10, 10, 10, 10)
+        self.search_layout = QHBoxLayout()
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Search notification history")
+        self.search_input.setClearButtonEnabled(True)
+        self.search_input.textChanged.connect(self._on_search_changed)
+        self.search_layout.addWidget(self.search_input)
+        self.clear_button = QPushButton("Clear History")
+        self.clear_button.clicked.connect(self._on_clear_clicked)
+        self.search_layout.addWidget(self.clear_button)
+        self.main_layout.addLayout(self.search_layout)
+        self.model = HistoryModel()
+        self.list_view = QListView()
+        self.list_view.setModel(self.model)
+        self.list_view.setUniformItemSizes(True)
+        self.list_view.setWordWrap(True)
+        self.main_layout.addWidget(self.list_view)
+        self.empty_label = QLabel("No notification history.")
+        self.empty_label.setAlignment(Qt.AlignCenter)
+        self.main_layout.addWidget(self.empty_label)
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(200)
+        self.search_timer.timeout.connect(self.refresh)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+
+    def refresh(self):
+        self.model.reset(self.search_input.text())
+        self.empty_label.setVisible(self.model.rowCount() == 0)
+
+    def _on_search_changed(self, text):
+        self.search_timer.start()
+
+    def _on_clear_clicked(self):
+        answer = QMessageBox.question(self, "Clear History", "Delete all stored notification history?")
+        if answer != QMessageBox.Yes:
+            return
+        NotificationHistory().clear()
+        self.refresh()
@@ -39,25 +39,28 @@ class MediaPlayerView(QWidget):
         self.next_button.clicked.connect(self._skip_next)
         self.controls_layout.addWidget(self.next_button)
         self.layout.addLayout(self.controls_layout)
-        self.app_state.status_changed.connect(self._update_media_player_ui)
-        self._update_media_player_ui()
+        self.app_state.track_changed.connect(self._update_track)
+        self.app_state.playback_changed.connect(self._update_playback)
+        music = self.app_state.status.music if self.app_state.status else None
+        self._update_track(music)
+        self._update_playback(music)
 
-    def _update_media_player_ui(self):
-        if self.app_state.status and self.app_state.status.music:
-            music = self.app_state.status.music
+    def _update_track(self, music):
+        if music:
             self.title_label.setText(music.title)
             self.artist_label.setText(music.artist)
-            self.play_pause_button.setIcon(
-                QIcon.fromTheme(
-                    "media-playback-pause"
-                    if music.is_playing
-                    else "media-playback-start"
-                )
-            )
         else:
             self.title_label.setText("No Music Playing")
             self.artist_label.setText("")
-            self.play_pause_button.setIcon(QIcon.fromTheme("media-playback-start"))
+
+    def _update_playback(self, music):
+        self.play_pause_button.setIcon(
+            QIcon.fromTheme(
+                "media-playback-pause"
+                if music and music.is_playing
+                else "media-playback-start"
+            )
+        )
 
     def _toggle_play_pause(self):
         WebSocketServer().send_media_action("playPause")
@@ -5,6 +5,7 @@ from PySide6.QtCore import Qt, Signal, QPropertyAnimation, QEasingCurve, QPoint
 from PySide6.QtGui import QPixmap, QIcon, QMouseEvent
 
 from app.core.app_state import AppState
+from app.core.notification_store import notification_key
 from app.model.notification import Notification
 
 
@@ -70,17 +71,26 @@ class NotificationView(QWidget):
         self.main_layout.addWidget(self.app_icon_label)
         self.text_layout = QVBoxLayout()
         self.text_layout.setContentsMargins(0, 0, 0, 0)
-        self.title_label = QLabel(f"{notification.app} - {notification.title}")
+        self.title_label = QLabel()
         self.title_label.setStyleSheet("font-weight: bold;")
         self.text_layout.addWidget(self.title_label)
-        self.body_label = QLabel(notification.body)
+        self.body_label = QLabel()
         self.body_label.setWordWrap(True)
         self.text_layout.addWidget(self.body_label)
         self.main_layout.addLayout(self.text_layout)
         self.main_layout.addStretch()
         self.setSizePolicy(QSizePolicy.Preferred, QSizePolicy.Fixed)
+        self.set_notification(notification)
         self.app_state.app_icons_changed.connect(self.update_app_icon)
 
+    def set_notification(self, notification: Notification):
+        package_changed = notification.package != self.notification.package
+        self.notification = notification
+        self.title_label.setText(f"{notification.app} - {notification.title}")
+        self.body_label.setText(notification.body)
+        if package_changed:
+            self.update_app_icon()
+
     def mousePressEvent(self, event: QMouseEvent):
         if event.button() == Qt.LeftButton:
             self._start_pos_x = event.globalPosition().x()
@@ -167,25 +177,46 @@ class NotificationListView(QWidget):
         self.main_layout = QVBoxLayout(self)
         self.main_layout.setContentsMargins(0, 0, 0, 0)
         self.main_layout.setAlignment(Qt.AlignTop)
+        self.no_notifications_label = QLabel("No notifications yet.")
+        self.no_notifications_label.setAlignment(Qt.AlignCenter)
+        self.main_layout.addWidget(self.no_notifications_label)
+        self.notification_widgets = {}
         self.app_state.notifications_changed.connect(self.update_notification_list)
+        self.app_state.notification_inserted.connect(self._insert_notification)
+        self.app_state.notification_moved.connect(self._move_notification)
+        self.app_state.notification_removed.connect(self._remove_notification)
         self.update_notification_list(self.app_state.notifications)
 
     def update_notification_list(self, notifications):
-        for i in reversed(range(self.main_layout.count())):
-            widget = self.main_layout.itemAt(i).widget()
-            if widget:
-                widget.deleteLater()
-
-        if not notifications:
-            no_notifications_label = QLabel("No notifications yet.")
-            no_notifications_label.setAlignment(Qt.AlignCenter)
-            self.main_layout.addWidget(no_notifications_label)
-        else:
-            for notification in notifications:
-                notification_widget = NotificationView(notification)
-                notification_widget.delete_notification_signal.connect(self._handle_delete_notification)
-                notification_widget.hide_notification_signal.connect(self._handle_hide_notification)
-                self.main_layout.addWidget(notification_widget)
+        for widget in self.notification_widgets.values():
+            self.main_layout.removeWidget(widget)
+            widget.deleteLater()
+        self.notification_widgets = {}
+        for position, notification in enumerate(notifications):
+            self._insert_notification(notification, position)
+        self.no_notifications_label.setVisible(not self.notification_widgets)
+
+    def _insert_notification(self, notification, position=0):
+        notification_widget = NotificationView(notification)
+        notification_widget.delete_notification_signal.connect(self._handle_delete_notification)
+        notification_widget.hide_notification_signal.connect(self._handle_hide_notification)
+        self.notification_widgets[notification_key(notification)] = notification_widget
+        self.main_layout.insertWidget(position + 1, notification_widget)
+        self.no_notifications_label.setVisible(False)
+
+    def _move_notification(self, notification):
+        notification_widget = self.notification_widgets.get(notification_key(notification))
+        if notification_widget:
+            notification_widget.set_notification(notification)
+            self.main_layout.removeWidget(notification_widget)
+            self.main_layout.insertWidget(1, notification_widget)
+
+    def _remove_notification(self, notification):
+        notification_widget = self.notification_widgets.pop(notification_key(notification), None)
+        if notification_widget:
+            self.main_layout.removeWidget(notification_widget)
+            notification_widget.deleteLater()
+        self.no_notifications_label.setVisible(not self.notification_widgets)
 
     def _handle_delete_notification(self, notification):
         self.app_state.remove_notification(notification)
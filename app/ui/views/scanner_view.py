@@ -1,5 +1,4 @@
-import qrcode
-
+import asyncio
 from urllib.parse import quote_plus
 from PySide6.QtWidgets import QWidget, QVBoxLayout, QLabel
 from PySide6.QtGui import QPixmap
@@ -34,7 +33,9 @@ class ScannerView(QWidget):
         self.app_state = AppState()
         self.app_state.websocket_status_changed.connect(self.update_status_display)
         self.app_state.should_refresh_qr_changed.connect(self.handle_refresh_qr)
-        self.generate_qr_async()
+        self.app_state.local_ip_address_changed.connect(self._on_local_ip_address_changed)
+        if self.app_state.local_ip_address:
+            self.generate_qr_async()
         self.update_status_display(self.app_state.websocket_status)
 
     def status_info(self, status):
@@ -52,8 +53,13 @@ class ScannerView(QWidget):
         text, color = self.status_info(status)
         self.status_label.setText(text)
 
+    def _on_local_ip_address_changed(self, ip):
+        self.generate_qr_async()
+
     def generate_qr_async(self):
-        ip = self.app_state.get_local_ip_address()
+        import qrcode
+
+        ip = self.app_state.local_ip_address
         port = self.app_state.my_device.port if self.app_state.my_device else 6996
         name = self.app_state.my_device.name if self.app_state.my_device else "Unknown"
         print(f"DEBUG: QR generation - IP: {ip}, Port: {port}, Name: {name}")
@@ -92,5 +98,6 @@ class ScannerView(QWidget):
 
     def handle_refresh_qr(self, value):
         if value:
-            self.generate_qr_async()
+            # the network may have changed; the new address regenerates the code via local_ip_address_changed
+            asyncio.ensure_future(self.app_state.refresh_local_ip_address())
             self.app_state.should_refresh_qr = False
@@ -1,6 +1,7 @@
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton,
-    QCheckBox, QSlider, QGroupBox, QFormLayout, QMessageBox, QScrollArea
+    QCheckBox, QSlider, QGroupBox, QFormLayout, QMessageBox, QScrollArea,
+    QTableWidget, QTableWidgetItem, QHeaderView
 )
 from PySide6.QtCore import Qt, QTimer, QUrl
 from PySide6.QtGui import QDesktopServices, QIntValidator
@@ -10,6 +11,7 @@ from app.core.app_state import AppState
 from app.core.adb_connector import ADBConnector
 from app.model.license_details import LicenseDetails
 from app.core.gumroad import check_license_key_validity
+from app.core.metrics import Metrics
 
 class SettingsView(QWidget):
     def __init__(self):
@@ -95,7 +97,7 @@ class SettingsView(QWidget):
         self.scroll_layout.addWidget(self.sync_group)
         self.connection_info_group = QGroupBox("Connection Info")
         self.connection_info_layout = QFormLayout(self.connection_info_group)
-        self.ip_address_label = QLabel(self.app_state.get_local_ip_address() or "N/A")
+        self.ip_address_label = QLabel(self.app_state.local_ip_address or "N/A")
         self.connection_info_layout.addRow("IP Address:", self.ip_address_label)
         self.server_port_input = QLineEdit()
         self.server_port_input.setFixedWidth(100)
@@ -120,6 +122,33 @@ class SettingsView(QWidget):
         self.opacity_layout.addWidget(self.opacity_slider)
         self.opacity_layout.addWidget(self.opacity_value_label)
         self.scroll_layout.addLayout(self.opacity_layout)
+        self.debug_group = QGroupBox("Debug")
+        self.debug_layout = QVBoxLayout(self.debug_group)
+        self.metrics_enabled_layout = QHBoxLayout()
+        self.metrics_enabled_label = QLabel(f"Metrics endpoint (127.0.0.1:{self.app_state.metrics_port}):")
+        self.metrics_enabled_checkbox = QCheckBox()
+        self.metrics_enabled_checkbox.setChecked(self.app_state.metrics_enabled)
+        self.metrics_enabled_checkbox.stateChanged.connect(self._on_metrics_enabled_changed)
+        self.metrics_enabled_layout.addWidget(self.metrics_enabled_label)
+        self.metrics_enabled_layout.addStretch()
+        self.metrics_enabled_layout.addWidget(self.metrics_enabled_checkbox)
+        self.debug_layout.addLayout(self.metrics_enabled_layout)
+        self.metrics_table = QTableWidget(0, 6)
+        self.metrics_table.setHorizontalHeaderLabels(["Dir", "Type", "Count", "Bytes", "p50 ms", "p99 ms"])
+        self.metrics_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.metrics_table.verticalHeader().setVisible(False)
+        self.metrics_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.metrics_table.setMinimumHeight(160)
+        self.debug_layout.addWidget(self.metrics_table)
+        self.queue_stats_label = QLabel()
+        self.debug_layout.addWidget(self.queue_stats_label)
+        self.metrics_reset_button = QPushButton("Reset Metrics")
+        self.metrics_reset_button.clicked.connect(self._on_metrics_reset_clicked)
+        self.debug_layout.addWidget(self.metrics_reset_button)
+        self.scroll_layout.addWidget(self.debug_group)
+        self.metrics_timer = QTimer(self)
+        self.metrics_timer.timeout.connect(self._update_metrics_panel)
+        self.metrics_timer.start(1000)
         self.license_group = QGroupBox("AirSync+")
         self.license_layout = QVBoxLayout(self.license_group)
         self.license_key_input = QLineEdit()
@@ -179,6 +208,7 @@ Enjoy the app!
         self.app_state.is_plus_changed.connect(self._update_plus_features_label)
         self.app_state.window_opacity_changed.connect(self._update_opacity_label)
         self.app_state.is_clipboard_sync_enabled_changed.connect(self._update_clipboard_sync_checkbox)
+        self.app_state.local_ip_address_changed.connect(self._update_ip_address_label)
         self.app_state.license_details_changed.connect(self._update_license_details_ui)
         self.setTabOrder(self.device_name_input, self.adb_port_input)
         self.setTabOrder(self.adb_port_input, self.server_port_input)
@@ -190,9 +220,11 @@ Enjoy the app!
 
     def _on_device_name_changed(self, text):
         self.app_state.device_name = text
+        self.app_state.save_settings()
 
     def _on_adb_enabled_changed(self, state):
-        self.app_state.adb_enabled = state == Qt.Checked
+        self.app_state.adb_enabled = self.adb_enabled_checkbox.isChecked()
+        self.app_state.save_settings()
         self._update_adb_ui_state()
 
     def _update_adb_ui_state(self):
@@ -210,6 +242,7 @@ Enjoy the app!
             port = int(text)
             if 1 <= port <= 65535:
                 self.app_state.adb_port = port
+                self.app_state.save_settings()
         except ValueError:
             pass
 
@@ -220,17 +253,64 @@ Enjoy the app!
         ADBConnector.disconnect()
 
     def _on_mirroring_plus_changed(self, state):
-        self.app_state.mirroring_plus = state == Qt.Checked
+        self.app_state.mirroring_plus = self.mirroring_plus_checkbox.isChecked()
+        self.app_state.save_settings()
 
     def _on_clipboard_sync_changed(self, state):
-        self.app_state.is_clipboard_sync_enabled = state == Qt.Checked
+        self.app_state.is_clipboard_sync_enabled = self.sync_clipboard_checkbox.isChecked()
+        self.app_state.save_settings()
+        if self.app_state.is_clipboard_sync_enabled:
+            self.app_state.start_clipboard_monitoring()
+        else:
+            self.app_state.stop_clipboard_monitoring()
         print(f"Clipboard sync enabled: {self.app_state.is_clipboard_sync_enabled}")
 
+    def _on_metrics_enabled_changed(self, state):
+        self.app_state.metrics_enabled = self.metrics_enabled_checkbox.isChecked()
+        self.app_state.save_settings()
+        WebSocketServer().set_metrics_enabled(self.app_state.metrics_enabled)
+
+    def _on_metrics_reset_clicked(self):
+        Metrics().reset()
+        self._update_metrics_panel()
+
+    def _update_metrics_panel(self):
+        if not self.debug_group.isVisible():
+            return
+        rows = Metrics().snapshot()
+        self.metrics_table.setRowCount(len(rows))
+        for row, entry in enumerate(rows):
+            values = (
+                entry["direction"],
+                entry["type"],
+                str(entry["count"]),
+                str(entry["bytes"]),
+                self._format_latency(entry["p50"]),
+                self._format_latency(entry["p99"]),
+            )
+            for column, value in enumerate(values):
+                self.metrics_table.setItem(row, column, QTableWidgetItem(value))
+        sessions = WebSocketServer().outbound_stats()
+        self.queue_stats_label.setText(
+            f"Outbound queues: {len(sessions)} sessions, "
+            f"depth {sum(s['depth'] for s in sessions)}, "
+            f"max {max((s['max_depth'] for s in sessions), default=0)}, "
+            f"dropped {sum(s['dropped'] for s in sessions)}"
+        )
+
+    def _format_latency(self, seconds):
+        if seconds is None:
+            return "-"
+        if seconds == float("inf"):
+            return ">2500"
+        return f"≤{seconds * 1000:g}"
+
     def _on_server_port_changed(self, text):
         try:
             port = int(text)
             if 1 <= port <= 65535:
                 self.app_state.port = port
+                self.app_state.save_settings()
         except ValueError:
             pass
 
@@ -244,6 +324,7 @@ Enjoy the app!
 
     def _on_opacity_changed(self, value):
         self.app_state.window_opacity = value / 100.0
+        self.app_state.save_settings()
         self.opacity_value_label.setText(f"{value}%")
 
     def _on_check_license_clicked(self):
@@ -278,6 +359,9 @@ Enjoy the app!
     def _update_clipboard_sync_checkbox(self, enabled):
         self.sync_clipboard_checkbox.setChecked(enabled)
 
+    def _update_ip_address_label(self, ip):
+        self.ip_address_label.setText(ip or "N/A")
+
     def _update_license_details_ui(self):
         if self.app_state.license_details:
             details = self.app_state.license_details
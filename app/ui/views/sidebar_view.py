@@ -1,4 +1,4 @@
-from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QSizePolicy
+from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QSizePolicy, QComboBox
 from PySide6.QtCore import Qt
 
 from app.core.app_state import AppState
@@ -16,6 +16,9 @@ class SidebarView(QWidget):
         self.phone_view = PhoneView()
         self.phone_view.setSizePolicy(QSizePolicy.Preferred, QSizePolicy.Expanding)
         self.layout.addWidget(self.phone_view)
+        self.device_selector = QComboBox()
+        self.device_selector.currentIndexChanged.connect(self._on_device_selected)
+        self.layout.addWidget(self.device_selector)
         self.button_layout = QHBoxLayout()
         self.button_layout.setContentsMargins(20, 0, 20, 20)
         self.mirror_button = QPushButton("Mirror")
@@ -26,7 +29,10 @@ class SidebarView(QWidget):
         self.button_layout.addWidget(self.disconnect_button)
         self.layout.addLayout(self.button_layout)
         self.app_state.adb_connected_changed.connect(self._update_button_states)
+        self.app_state.devices_changed.connect(self._update_device_selector)
+        self.app_state.device_changed.connect(self._update_device_selector)
         self._update_button_states()
+        self._update_device_selector()
 
     def _update_device_status_visibility(self):
         if self.app_state.status:
@@ -34,6 +40,21 @@ class SidebarView(QWidget):
         else:
             self.device_status_view.setVisible(False)
 
+    def _update_device_selector(self, *args):
+        self.device_selector.blockSignals(True)
+        self.device_selector.clear()
+        for key, state in self.app_state.devices.items():
+            self.device_selector.addItem(state.device.name or key, key)
+        index = self.device_selector.findData(self.app_state.active_device_key)
+        self.device_selector.setCurrentIndex(index)
+        self.device_selector.blockSignals(False)
+        self.device_selector.setVisible(len(self.app_state.devices) > 1)
+
+    def _on_device_selected(self, index):
+        key = self.device_selector.itemData(index)
+        if key and key != self.app_state.active_device_key:
+            self.app_state.select_device(key)
+
     def _update_button_states(self):
         self.mirror_button.setVisible(self.app_state.adb_connected)
         if self.app_state.adb_connected:
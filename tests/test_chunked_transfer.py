@@ -0,0 +1,86 @@
+import asyncio
+import hashlib
+
+import pytest
+
+from app.constants import Defaults
+from app.core.chunked_transfer import TransferManager, TransferError
+
+DATA = bytes(range(256)) * 64
+CHECKSUM = hashlib.sha256(DATA).hexdigest()
+HALF = len(DATA) // 2
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    return TransferManager()
+
+
+def begin(manager, owner="phone", transfer_id="t1", checksum=CHECKSUM):
+    transfer = manager.begin(owner, transfer_id, "wallpaper", "", len(DATA), checksum)
+    if transfer.resuming:
+        transfer = asyncio.run(manager.resume(transfer))
+    return transfer
+
+
+def test_resume_from_part_file_after_restart(manager):
+    begin(manager)
+    assert manager.write_chunk("phone", "t1", 0, DATA[:HALF]) == HALF
+    manager.suspend()
+
+    restarted = TransferManager()
+    pending = restarted.begin("phone", "t1", "wallpaper", "", len(DATA), CHECKSUM)
+    assert pending.resuming
+    with pytest.raises(TransferError):
+        restarted.begin("phone", "t1", "wallpaper", "", len(DATA), CHECKSUM)
+
+    transfer = asyncio.run(restarted.resume(pending))
+    assert transfer.offset == HALF
+    assert restarted.write_chunk("phone", "t1", HALF, DATA[HALF:]) == len(DATA)
+    assert restarted.finish("phone", "t1").path.read_bytes() == DATA
+
+
+def test_rebegin_on_same_connection_keeps_offset(manager):
+    first = begin(manager)
+    manager.write_chunk("phone", "t1", 0, DATA[:HALF])
+    assert begin(manager) is first
+    assert first.offset == HALF
+
+
+def test_offset_mismatch_returns_current_offset(manager):
+    transfer = begin(manager)
+    manager.write_chunk("phone", "t1", 0, DATA[:HALF])
+    assert manager.write_chunk("phone", "t1", 0, DATA[:HALF]) == HALF
+    assert manager.write_chunk("phone", "t1", HALF + 1, DATA[HALF + 1:]) == HALF
+    assert transfer.offset == HALF
+    manager.suspend()
+    assert transfer.path.stat().st_size == HALF
+
+
+def test_checksum_failure_discards_part_file(manager):
+    transfer = begin(manager, checksum="0" * 64)
+    manager.write_chunk("phone", "t1", 0, DATA)
+    with pytest.raises(TransferError, match="checksum"):
+        manager.finish("phone", "t1")
+    assert not transfer.path.exists()
+    assert not manager.transfers
+
+
+def test_transfer_ids_are_scoped_per_device(manager):
+    phone = begin(manager, owner="phone")
+    tablet = begin(manager, owner="tablet")
+    manager.write_chunk("phone", "t1", 0, DATA[:HALF])
+    assert tablet.offset == 0
+    assert phone.path != tablet.path
+    manager.abort("tablet", "t1")
+    assert manager.transfers == {("phone", "t1"): phone}
+
+
+def test_idle_transfers_expire_but_keep_part_file(manager, monkeypatch):
+    transfer = begin(manager)
+    manager.write_chunk("phone", "t1", 0, DATA[:HALF])
+    monkeypatch.setattr(Defaults, "transfer_idle_timeout", -1)
+    manager.expire_idle()
+    assert not manager.transfers
+    assert transfer.path.stat().st_size == HALF
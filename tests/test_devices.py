@@ -0,0 +1,19 @@
+import json
+
+from test_startup import run_python
+
+DEVICE_COUNTS = (1, 4)
+# round trips on an idle loop are a millisecond or two and jitter by as much again, so
+# the single-device p99 is floored before the ratio is taken
+P99_FLOOR_MS = 5.0
+MAX_P99_RATIO = 4.0
+
+
+def test_round_trip_p99_scales_with_devices(tmp_path):
+    result = run_python(
+        tmp_path, "-m", "app.tools.bench", "devices", "--json", "--duration", "2",
+        "--device-counts", ",".join(map(str, DEVICE_COUNTS)), timeout=120,
+    )
+    assert result.returncode == 0, result.stderr
+    single, many = (row["rtt_p99_ms"] for row in json.loads(result.stdout)["devices"])
+    assert many <= MAX_P99_RATIO * max(single, P99_FLOOR_MS), f"p99 {single} ms -> {many} ms"
@@ -0,0 +1,73 @@
+from app.core.notification_store import NotificationStore, INSERTED, MOVED, REMOVED
+from app.model.notification import Notification
+
+
+def post(store, nid, package="pkg", title="title"):
+    return store.upsert(Notification(title, "body", "App", nid, package))
+
+
+def nids(store):
+    return [notification.nid for notification in store]
+
+
+def test_repost_with_same_nid_replaces_and_moves_to_top():
+    store = NotificationStore(limit=10)
+    post(store, "1")
+    original = store.get("1")
+    post(store, "2")
+
+    events = post(store, "1", title="edited")
+    assert [(kind, n.nid, n.title) for kind, n in events] == [(MOVED, "1", "edited")]
+    assert events[0][1].id == original.id
+    assert nids(store) == ["1", "2"]
+    assert len(store) == 2
+
+
+def test_notifications_without_nid_are_never_deduplicated():
+    store = NotificationStore(limit=10)
+    post(store, None)
+    post(store, None)
+    assert len(store) == 2
+
+
+def test_cap_evicts_before_inserting():
+    store = NotificationStore(limit=3)
+    for nid in "123":
+        post(store, nid)
+
+    events = post(store, "4")
+    assert [(kind, n.nid) for kind, n in events] == [(REMOVED, "1"), (INSERTED, "4")]
+    assert nids(store) == ["4", "3", "2"]
+
+
+def test_oldest_policy_counts_a_repost_as_new():
+    store = NotificationStore(limit=3, eviction="oldest")
+    for nid in "123":
+        post(store, nid)
+    post(store, "1")
+
+    post(store, "4")
+    assert nids(store) == ["4", "1", "3"]
+
+
+def test_app_policy_evicts_from_the_busiest_app():
+    store = NotificationStore(limit=4, eviction="app")
+    post(store, "quiet", package="mail")
+    for nid in ("a", "b", "c"):
+        post(store, nid, package="chat")
+
+    events = post(store, "d", package="chat")
+    assert [(kind, n.nid) for kind, n in events] == [(REMOVED, "a"), (INSERTED, "d")]
+    assert "quiet" in store
+
+    post(store, "b", package="chat")
+    post(store, "e", package="chat")
+    assert nids(store) == ["e", "b", "d", "quiet"]
+
+
+def test_unknown_eviction_policy_falls_back_to_oldest():
+    store = NotificationStore(limit=1, eviction="bogus")
+    assert store.eviction == "oldest"
+    post(store, "1")
+    post(store, "2")
+    assert nids(store) == ["2"]
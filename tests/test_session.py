@@ -0,0 +1,43 @@
+from app.core.session import Session
+
+
+def queued(session):
+    return [message_type for message_type, _, _, _ in session.queue]
+
+
+def full_session(*message_types):
+    # no writer is started, so the queue only drains when a test says so
+    session = Session(websocket=None, max_queue=len(message_types))
+    for message_type in message_types:
+        session.enqueue({"type": message_type})
+    return session
+
+
+def test_full_queue_evicts_droppable_before_keep():
+    session = full_session("mediaControl", "volumeControl", "mediaControl")
+    session.enqueue({"type": "dismissNotification"})
+    assert queued(session) == ["mediaControl", "mediaControl", "dismissNotification"]
+    assert session.dropped == 1
+
+
+def test_keep_frames_overflow_instead_of_evicting_each_other():
+    session = full_session("mediaControl", "mediaControl")
+    session.enqueue_frame("transferChunk", b"chunk")
+    assert queued(session) == ["mediaControl", "mediaControl", "transferChunk"]
+    assert session.dropped == 0
+
+
+def test_droppable_newcomer_is_dropped_when_only_keep_frames_remain():
+    session = full_session("mediaControl", "mediaControl")
+    session.enqueue({"type": "volumeControl"})
+    assert queued(session) == ["mediaControl", "mediaControl"]
+    assert session.dropped == 1
+
+
+def test_coalesced_message_replaces_pending_one():
+    session = full_session("clipboardUpdate", "mediaControl")
+    session.enqueue({"type": "clipboardUpdate", "data": {"text": "newer"}})
+    assert queued(session) == ["clipboardUpdate", "mediaControl"]
+    assert b"newer" in session.queue[0][1].encode()
+    assert session.coalesced == 1
+
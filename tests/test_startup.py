@@ -0,0 +1,35 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# generous enough for a loaded CI machine; a regression that imports Pillow or builds
+# the QR code before first paint still shows up in the deferred modules check below
+FIRST_PAINT_BUDGET_MS = 5000
+
+
+def run_python(tmp_path, *args, timeout=60):
+    env = {**os.environ, "HOME": str(tmp_path), "QT_QPA_PLATFORM": "offscreen"}
+    return subprocess.run(
+        [sys.executable, *args], cwd=ROOT, env=env, capture_output=True, text=True, timeout=timeout,
+    )
+
+
+def test_deferred_modules_not_loaded_at_import(tmp_path):
+    result = run_python(tmp_path, "-c", (
+        "import sys, app.main\n"
+        "from app.core.startup import DEFERRED_MODULES\n"
+        "print('loaded:', *(name for name in DEFERRED_MODULES if name in sys.modules))\n"
+    ))
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().endswith("loaded:"), result.stdout
+
+
+def test_first_paint_within_budget(tmp_path):
+    result = run_python(tmp_path, "-m", "app.main", "--startup-budget", str(FIRST_PAINT_BUDGET_MS))
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert "first paint" in result.stdout
+    assert "deferred modules loaded: none" in result.stdout
+    assert f"budget {FIRST_PAINT_BUDGET_MS:.1f} ms: ok" in result.stdout